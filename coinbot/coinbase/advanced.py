@@ -6,22 +6,29 @@ Copyright (C) 2021 - 2025 Austin Berrio
 @ref https://docs.cdp.coinbase.com/coinbase-app/trade/reference
 """
 
-from typing import Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, Union
 
+import numpy as np
+
+from coinbot.coinbase import candles as ohlc
 from coinbot.coinbase.client import Client, Subscriber
 
 
 class Account(Subscriber):
-    def list(self, params: Optional[dict] = None) -> Iterator[dict]:
+    def list(self, params: Optional[dict] = None, prefetch: int = 0) -> Iterator[dict]:
         """
         List accounts with optional pagination parameters.
 
         :param params: Query parameters for pagination.
             - limit (int): The number of accounts to return per page.
             - cursor (str): The cursor for pagination.
+        :param prefetch: Pages to fetch ahead in the background (0 disables).
         :return: A dictionary containing the list of accounts.
         """
-        return self.client.paginate("accounts", key="accounts", params=params)
+        return self.client.paginate(
+            "accounts", key="accounts", params=params, prefetch=prefetch
+        )
 
     def get(self, account_uuid: str) -> dict:
         """
@@ -80,7 +87,7 @@ class Order(Subscriber):
         """
         return self.client.get(f"orders/historical/{order_id}").json()
 
-    def fills(self, params: Optional[dict] = None) -> Iterator[dict]:
+    def fills(self, params: Optional[dict] = None, prefetch: int = 0) -> Iterator[dict]:
         """
         Fetch historical fills with optional filters.
 
@@ -93,13 +100,14 @@ class Order(Subscriber):
             - limit (int): Max number of fills.
             - cursor (str): Pagination cursor.
             - sort_by (str): Sort key (e.g., "trade_time").
+        :param prefetch: Pages to fetch ahead in the background (0 disables).
         :return: Dictionary containing list of fills.
         """
         return self.client.paginate(
-            "orders/historical/fills", key="fills", params=params
+            "orders/historical/fills", key="fills", params=params, prefetch=prefetch
         )
 
-    def list(self, params: Optional[dict] = None) -> Iterator[dict]:
+    def list(self, params: Optional[dict] = None, prefetch: int = 0) -> Iterator[dict]:
         """
         List all historical orders with optional filters.
 
@@ -115,10 +123,11 @@ class Order(Subscriber):
             - limit (int): Maximum number of orders to return.
             - cursor (str): Cursor for pagination.
             - sort_by (str): Sort by (e.g. "limit_price", "last_fill_time").
+        :param prefetch: Pages to fetch ahead in the background (0 disables).
         :return: Dictionary containing order data.
         """
         return self.client.paginate(
-            "orders/historical/batch", key="orders", params=params
+            "orders/historical/batch", key="orders", params=params, prefetch=prefetch
         )
 
 
@@ -192,6 +201,47 @@ class Product(Subscriber):
                 raise ValueError(f"Missing required parameter: '{key}'")
         return self.client.get(f"products/{product_id}/candles", params=params).json()
 
+    def candles_range(
+        self,
+        product_id: str,
+        start: ohlc.Timestamp,
+        end: ohlc.Timestamp,
+        granularity: Union[int, str] = "ONE_MINUTE",
+        workers: int = 8,
+    ) -> dict[str, np.ndarray]:
+        """
+        Retrieve historical OHLC data for an arbitrary time span.
+
+        The span is split into windows of at most ohlc.MAX_CANDLES buckets
+        which are fetched concurrently; the shared rate limiter paces them.
+
+        :param product_id: The trading pair (e.g., BTC-USD).
+        :param start: Inclusive start as UNIX seconds, ISO 8601 or datetime.
+        :param end: Exclusive end as UNIX seconds, ISO 8601 or datetime.
+        :param granularity: Bucket size by name (e.g., ONE_MINUTE) or seconds.
+        :param workers: Maximum number of requests in flight.
+        :return: Columns start, low, high, open, close, volume as NumPy arrays,
+            sorted by start with duplicate buckets removed.
+        """
+        name = ohlc.to_name(granularity)
+
+        def fetch(window: tuple[int, int]):
+            params = {"start": str(window[0]), "end": str(window[1])}
+            return self.candles(product_id, {**params, "granularity": name})
+
+        spans = ohlc.windows(start, end, granularity)
+        if not spans:
+            return ohlc.empty()
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(spans)))) as pool:
+            responses = list(pool.map(fetch, spans))
+
+        result = ohlc.columns(responses)
+        # Windows are aligned to the bucket, so trim anything outside the span
+        mask = (result["start"] >= ohlc.to_unix(start)) & (
+            result["start"] < ohlc.to_unix(end)
+        )
+        return {key: np.ascontiguousarray(value[mask]) for key, value in result.items()}
+
     def list(self, params: Optional[dict] = None) -> list:
         """
         List all available trading products.
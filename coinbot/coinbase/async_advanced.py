@@ -0,0 +1,224 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.async_advanced
+@brief A High-Level asyncio API Adapter for Coinbase Advanced
+@license AGPL
+@ref https://docs.cdp.coinbase.com/coinbase-app/trade/reference
+
+Coroutine counterparts of the subscribers in coinbot.coinbase.advanced.
+Responses are returned already decoded, so fan out with asyncio.gather:
+
+    books = await asyncio.gather(
+        *(advanced.product.book({"product_id": p}) for p in product_ids)
+    )
+"""
+
+from typing import AsyncIterator, Optional
+
+from coinbot.coinbase.async_client import AsyncClient, AsyncSubscriber
+
+
+class AsyncAccount(AsyncSubscriber):
+    def list(self, params: Optional[dict] = None) -> AsyncIterator[dict]:
+        """
+        List accounts with optional pagination parameters.
+
+        :param params: Query parameters for pagination (limit, cursor).
+        :return: An async iterator over account dictionaries.
+        """
+        return self.client.paginate("accounts", key="accounts", params=params)
+
+    async def get(self, account_uuid: str) -> dict:
+        """
+        Retrieve details of a specific account by its UUID.
+
+        :param account_uuid: The UUID of the account.
+        :return: A dictionary containing the account details.
+        """
+        return await self.client.get(f"accounts/{account_uuid}")
+
+
+class AsyncOrder(AsyncSubscriber):
+    async def cancel(self, *, order_ids: list[str]) -> dict:
+        """
+        Cancel one or more orders by UUID.
+
+        :param order_ids: List of order UUIDs to cancel.
+        :return: Dictionary containing success/failure results per ID.
+        """
+        if not order_ids:
+            raise ValueError("Must provide at least one order ID.")
+        return await self.client.post(
+            "orders/batch_cancel", data={"order_ids": order_ids}
+        )
+
+    async def create(self, params: dict) -> dict:
+        """
+        Create a new order.
+
+        :param params: See coinbot.coinbase.advanced.Order.create.
+        :return: Dictionary containing the created order details.
+        """
+        required = ("client_order_id", "product_id", "side", "order_configuration")
+        for key in required:
+            if key not in params:
+                raise ValueError(f"Missing required parameter: '{key}'")
+        return await self.client.post("orders", data=params)
+
+    async def get(self, order_id: str) -> dict:
+        """
+        Retrieve historical order details by ID.
+
+        :param order_id: Order UUID.
+        :return: Dictionary containing order details.
+        """
+        return await self.client.get(f"orders/historical/{order_id}")
+
+    def fills(self, params: Optional[dict] = None) -> AsyncIterator[dict]:
+        """
+        Fetch historical fills with optional filters.
+
+        :param params: See coinbot.coinbase.advanced.Order.fills.
+        :return: An async iterator over fills.
+        """
+        return self.client.paginate(
+            "orders/historical/fills", key="fills", params=params
+        )
+
+    def list(self, params: Optional[dict] = None) -> AsyncIterator[dict]:
+        """
+        List all historical orders with optional filters.
+
+        :param params: See coinbot.coinbase.advanced.Order.list.
+        :return: An async iterator over orders.
+        """
+        return self.client.paginate(
+            "orders/historical/batch", key="orders", params=params
+        )
+
+
+class AsyncProduct(AsyncSubscriber):
+    async def best_bid_ask(self, product_ids: list[str]) -> dict:
+        """
+        Retrieve best bid/ask for one or more products.
+
+        :param product_ids: List of product IDs (e.g., BTC-USD,ETH-USD).
+        :return: Dictionary with best bid/ask prices keyed by product_id.
+        """
+        if not product_ids:
+            raise ValueError("Must provide at least one product ID.")
+        return await self.client.get(
+            "best_bid_ask", params={"product_ids": product_ids}
+        )
+
+    async def ticker(self, product_id: str, params: dict) -> dict:
+        """
+        Retrieve recent trade price summary for a product.
+
+        :param product_id: The trading pair (e.g., BTC-USD).
+        :param params: Query parameters; 'limit' is required.
+        :return: Dictionary with OHLC and trade data.
+        """
+        if "limit" not in params:
+            raise ValueError("Missing required parameter: 'limit'")
+        return await self.client.get(f"products/{product_id}/ticker", params=params)
+
+    async def get(self, product_id: str) -> dict:
+        """
+        Get metadata and market config for a product.
+
+        :param product_id: The trading pair (e.g., BTC-USD).
+        :return: Dictionary describing product config.
+        """
+        return await self.client.get(f"products/{product_id}")
+
+    async def book(self, params: dict) -> dict:
+        """
+        Retrieve the current order book for a product.
+
+        :param params: Query parameters; 'product_id' is required.
+        :return: Dictionary with bids, asks, and metadata.
+        """
+        if "product_id" not in params:
+            raise ValueError("Missing required parameter: 'product_id'")
+        return await self.client.get("product_book", params=params)
+
+    async def candles(self, product_id: str, params: dict) -> list:
+        """
+        Retrieve historical OHLC data for a product.
+
+        :param product_id: The trading pair (e.g., BTC-USD).
+        :param params: Query parameters; 'start', 'end' and 'granularity'
+            are required.
+        :return: List of candles, each as [start, low, high, open, close, volume].
+        """
+        for key in ("start", "end", "granularity"):
+            if key not in params:
+                raise ValueError(f"Missing required parameter: '{key}'")
+        return await self.client.get(f"products/{product_id}/candles", params=params)
+
+    async def list(self, params: Optional[dict] = None) -> list:
+        """
+        List all available trading products.
+
+        :param params: See coinbot.coinbase.advanced.Product.list.
+        :return: List of product metadata.
+        """
+        return await self.client.get("products", params=params)
+
+
+class AsyncCoinbaseAdvanced:
+    def __init__(self, client: AsyncClient):
+        self.client = client
+        self.account = AsyncAccount(client)
+        self.order = AsyncOrder(client)
+        self.product = AsyncProduct(client)
+
+    def __repr__(self) -> str:
+        return f"AsyncCoinbaseAdvanced(key={self.key})"
+
+    def __str__(self) -> str:
+        return " ".join(word.capitalize() for word in self.name.split("_"))
+
+    @property
+    def key(self) -> str:
+        return self.client.auth.api.key
+
+    @property
+    def name(self):
+        return "coinbase_advanced"
+
+    def plug(self, cls: object, name: str):
+        instance = cls(self.client)
+        setattr(self, name, instance)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import json
+    import os
+
+    from dotenv import load_dotenv
+
+    from coinbot.coinbase.client import API, Auth
+
+    load_dotenv(".env")
+
+    api = API(
+        settings={
+            "key": os.getenv("COINBASE_API_KEY"),
+            "secret": os.getenv("COINBASE_API_SECRET"),
+            "version": 3,
+        }
+    )
+
+    async def main():
+        async with AsyncClient(api, Auth(api)) as client:
+            advanced = AsyncCoinbaseAdvanced(client)
+            products = ["BTC-USD", "ETH-USD", "SOL-USD"]
+            results = await asyncio.gather(
+                *(advanced.product.get(product_id) for product_id in products)
+            )
+            print(json.dumps(results, indent=2))
+
+    asyncio.run(main())
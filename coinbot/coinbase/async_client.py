@@ -0,0 +1,164 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.async_client
+@brief A Low-Level asyncio API Adapter for Coinbase Advanced
+@license AGPL
+@ref https://docs.cdp.coinbase.com/api-v2/docs/authentication
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+from coinbot.coinbase.client import API, Auth
+from coinbot.coinbase.limiter import RateLimiter
+from coinbot.coinbase.metrics import Instrument, endpoint
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class AsyncClient:
+    def __init__(
+        self,
+        api: API,
+        auth: Auth,
+        limiter: Optional[RateLimiter] = None,
+        connections: int = 100,
+        instrument: Optional[Instrument] = None,
+    ):
+        self.api = api
+        self.auth = auth
+        self.timeout = 30
+        self.connections = connections
+        # NOTE: Shares buckets with the blocking Client by default
+        self.limiter = limiter or RateLimiter.shared()
+        self.instrument = instrument
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # The session binds to the running loop, so create it lazily.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connections, keepalive_timeout=self.timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _encode(self, params: Optional[dict]) -> list[tuple[str, str]]:
+        # Mirror requests: list values become repeated query keys.
+        encoded = []
+        for key, value in (params or {}).items():
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple)) else [value]
+            encoded.extend((key, str(item)) for item in values)
+        return encoded
+
+    async def _throttle(self, path: str) -> None:
+        while True:
+            delay = self.limiter.try_acquire(path)
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    async def _request(self, method: str, path: str, data=None, params=None) -> dict:
+        clock = time.perf_counter
+        started = clock()
+        await self._throttle(path)
+        waited = clock()
+        url = self.api.url(path)
+        headers = self.auth.header(method, self.api.path(path), self.timeout)
+        signed = clock()
+
+        async with self.session.request(
+            method=method.upper(),
+            url=url,
+            headers=headers,
+            json=data,
+            params=self._encode(params),
+        ) as response:
+            body = await response.read()
+            received = clock()
+            if self.instrument is None:
+                response.raise_for_status()
+                return json.loads(body)
+
+            payload, decoded = None, received
+            if response.ok:
+                payload = json.loads(body)
+                decoded = clock()
+            self.instrument.request(
+                endpoint(path),
+                method,
+                response.status,
+                {
+                    "wait": waited - started,
+                    "sign": signed - waited,
+                    "network": received - signed,
+                    "decode": decoded - received,
+                },
+                sent=len(json.dumps(data)) if data is not None else 0,
+                received=len(body),
+            )
+            response.raise_for_status()
+            return payload
+
+    async def get(self, path: str, params=None) -> dict:
+        return await self._request("GET", path, params=params)
+
+    async def post(self, path: str, data=None) -> dict:
+        return await self._request("POST", path, data=data)
+
+    async def paginate(self, path: str, key: str, params=None) -> AsyncIterator[dict]:
+        seen = 0
+        params = params or {}
+        limit = params.get("limit", None)
+        while True:
+            response = await self.get(path, params=params)
+            items = response.get(key, [])
+
+            for item in items:
+                yield item
+                seen += 1
+                if limit is not None and seen >= limit:
+                    return
+
+            if not response.get("has_next") or not response.get("cursor"):
+                break
+
+            params = {**params, "cursor": response.get("cursor")}
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class AsyncSubscriber:
+    def __init__(self, client: AsyncClient):
+        self.__client = client
+
+    @property
+    def client(self) -> AsyncClient:
+        return self.__client
+
+    def encode_params(self, params: dict, keys: list[str]) -> dict:
+        encoded = params.copy()
+        for key in keys:
+            if key in params and isinstance(params[key], list):
+                encoded[key] = ",".join(params[key])
+        return encoded
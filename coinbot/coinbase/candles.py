@@ -0,0 +1,117 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.candles
+@brief Windowing and columnar helpers for Coinbase Advanced candles
+@license AGPL
+@ref https://docs.cdp.coinbase.com/advanced-trade/reference/retailbrokerageapi_getcandles
+"""
+
+from datetime import datetime, timezone
+from typing import Iterable, Union
+
+import numpy as np
+
+# Coinbase Advanced refuses requests spanning more candles than this.
+MAX_CANDLES = 300
+
+GRANULARITY = {
+    "ONE_MINUTE": 60,
+    "FIVE_MINUTE": 300,
+    "FIFTEEN_MINUTE": 900,
+    "THIRTY_MINUTE": 1800,
+    "ONE_HOUR": 3600,
+    "TWO_HOUR": 7200,
+    "SIX_HOUR": 21600,
+    "ONE_DAY": 86400,
+}
+
+COLUMNS = ("start", "low", "high", "open", "close", "volume")
+
+Timestamp = Union[int, float, str, datetime]
+
+
+def to_seconds(granularity: Union[int, str]) -> int:
+    """
+    Resolve a granularity name (e.g. "ONE_MINUTE") or seconds to seconds.
+    """
+    if isinstance(granularity, str):
+        if granularity not in GRANULARITY:
+            raise ValueError(f"Unsupported granularity: '{granularity}'")
+        return GRANULARITY[granularity]
+    if granularity not in GRANULARITY.values():
+        raise ValueError(f"Unsupported granularity: {granularity}s")
+    return int(granularity)
+
+
+def to_name(granularity: Union[int, str]) -> str:
+    """
+    Resolve a granularity in seconds or by name to its API name.
+    """
+    seconds = to_seconds(granularity)
+    return next(name for name, value in GRANULARITY.items() if value == seconds)
+
+
+def to_unix(value: Timestamp) -> int:
+    """
+    Convert a UNIX timestamp, ISO 8601 string or datetime to UNIX seconds.
+    """
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def windows(start: Timestamp, end: Timestamp, granularity: Union[int, str]):
+    """
+    Split [start, end) into spans the candles endpoint accepts.
+
+    :return: List of (start, end) UNIX second pairs, each covering at most
+        MAX_CANDLES buckets and aligned to the granularity.
+    """
+    step = to_seconds(granularity)
+    lo = to_unix(start) // step * step
+    hi = to_unix(end)
+    span = step * MAX_CANDLES
+    return [(s, min(s + span, hi)) for s in range(lo, hi, span)]
+
+
+def rows(response: Union[dict, list]) -> list:
+    """
+    Normalize a candles response to a list of [start, low, high, open, close, volume].
+
+    Accepts both the documented {"candles": [{...}]} payload and bare lists.
+    """
+    candles = response.get("candles", []) if isinstance(response, dict) else response
+    return [
+        [c[key] for key in COLUMNS] if isinstance(c, dict) else list(c) for c in candles
+    ]
+
+
+def columns(responses: Iterable[Union[dict, list]]) -> dict[str, np.ndarray]:
+    """
+    Merge candle responses into contiguous, de-duplicated columns sorted by start.
+
+    :return: Dictionary of arrays keyed by COLUMNS. 'start' is int64 UNIX
+        seconds and the remaining columns are float64.
+    """
+    table = [row for response in responses for row in rows(response)]
+    if not table:
+        return empty()
+
+    data = np.asarray(table, dtype=np.float64).reshape(-1, len(COLUMNS))
+    start = data[:, 0].astype(np.int64)
+    # np.unique sorts and keeps the first occurrence of each bucket
+    start, index = np.unique(start, return_index=True)
+    result = {"start": start}
+    for i, key in enumerate(COLUMNS[1:], start=1):
+        result[key] = np.ascontiguousarray(data[index, i])
+    return result
+
+
+def empty() -> dict[str, np.ndarray]:
+    result = {"start": np.empty(0, dtype=np.int64)}
+    result.update({key: np.empty(0, dtype=np.float64) for key in COLUMNS[1:]})
+    return result
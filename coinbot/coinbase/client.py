@@ -7,6 +7,7 @@ Copyright (C) 2021 - 2025 Austin Berrio
 """
 
 import logging
+import threading
 import time
 from dataclasses import dataclass, field
 from typing import Iterator, Optional
@@ -15,6 +16,10 @@ import requests
 from cdp.auth.utils.jwt import JwtOptions, generate_jwt
 from requests import Response
 
+from coinbot.coinbase.limiter import RateLimiter
+from coinbot.coinbase.metrics import Instrument, endpoint
+from coinbot.coinbase.transport import RetryPolicy, create_session, read_ahead
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
@@ -47,39 +52,149 @@ class API:
 
 
 class Auth:
-    def __init__(self, api: API):
+    def __init__(self, api: API, margin: float = 5.0):
         self.api = api
+        self.margin = margin  # seconds shaved off expires_in before re-signing
+        self.hits = 0
+        self.misses = 0
+        self._tokens: dict[tuple[str, str], tuple[str, float]] = {}
+        self._signing: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()  # guards the dicts and counters only
 
-    def header(self, method: str, path: str, timeout: int = 30) -> dict[str, str]:
-        token = generate_jwt(
-            JwtOptions(
-                api_key_id=self.api.key,
-                api_key_secret=self.api.secret,
-                request_method=method,
-                request_host="api.coinbase.com",
-                request_path=path,
-                expires_in=timeout,
+    def _cached(self, key: tuple[str, str]) -> Optional[str]:
+        # Called with self._lock held
+        cached = self._tokens.get(key)
+        if cached is not None and time.monotonic() < cached[1]:
+            self.hits += 1
+            return cached[0]
+        return None
+
+    def token(self, method: str, path: str, timeout: int = 30) -> str:
+        key = (method.upper(), path)
+        with self._lock:
+            token = self._cached(key)
+            if token is not None:
+                return token
+            signing = self._signing.setdefault(key, threading.Lock())
+
+        # Concurrent callers for the same endpoint wait for one signature;
+        # other endpoints sign and hit the cache in parallel.
+        with signing:
+            with self._lock:
+                token = self._cached(key)
+                if token is not None:
+                    return token
+                self.misses += 1
+            token = generate_jwt(
+                JwtOptions(
+                    api_key_id=self.api.key,
+                    api_key_secret=self.api.secret,
+                    request_method=key[0],
+                    request_host="api.coinbase.com",
+                    request_path=path,
+                    expires_in=timeout,
+                )
             )
-        )
+            if timeout > self.margin:
+                expires = time.monotonic() + timeout - self.margin
+                with self._lock:
+                    self._tokens[key] = (token, expires)
+            return token
+
+    def header(self, method: str, path: str, timeout: int = 30) -> dict[str, str]:
         return {
-            "Authorization": f"Bearer {token}",
+            "Authorization": f"Bearer {self.token(method, path, timeout)}",
             "Content-Type": "application/json",
             "Accept": "application/json",
         }
 
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class PaginationError(requests.RequestException):
+    def __init__(self, path: str, cursor: Optional[str], pages: int):
+        super().__init__(f"Pagination of '{path}' failed after {pages} pages")
+        self.path = path
+        self.cursor = cursor  # pass back as params["cursor"] to resume
+        self.pages = pages
+
+
+class DecodedResponse:
+    def __init__(self, response: Response, payload):
+        """
+        A response whose JSON body was decoded while it was observed.
+
+        json() returns the decoded payload; every other attribute is read
+        from the wrapped requests.Response, which is left untouched.
+        """
+        self.response = response
+        self.payload = payload
+
+    def json(self, **kwargs):
+        return self.payload
+
+    def __getattr__(self, name: str):
+        return getattr(self.response, name)
+
 
 class Client:
-    def __init__(self, api: API, auth: Auth):
+    def __init__(
+        self,
+        api: API,
+        auth: Auth,
+        limiter: Optional[RateLimiter] = None,
+        instrument: Optional[Instrument] = None,
+        retry: Optional[RetryPolicy] = None,
+        pool_size: int = 32,
+    ):
         self.api = api
         self.auth = auth
-        self.session = requests.Session()
+        self.session = create_session(pool_maxsize=pool_size)
         self.timeout = 30
-        self.rate_limit = 1 / (36000 / 3600)  # ~0.1s per request
+        # NOTE: Buckets are shared process-wide unless a limiter is given
+        self.limiter = limiter or RateLimiter.shared()
+        self.instrument = instrument
+        self.retry = retry or RetryPolicy()
 
     def _request(self, method: str, path: str, data=None, params=None) -> Response:
-        time.sleep(self.rate_limit)
+        attempt = 0
+        while True:
+            try:
+                response = self._send(method, path, data, params)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt >= self.retry.retries or not self.retry.can_retry(method):
+                    raise
+                delay = self.retry.delay(attempt)
+                reason = type(error).__name__
+            else:
+                if (
+                    response.ok
+                    or attempt >= self.retry.retries
+                    or not self.retry.can_retry(method, response.status_code)
+                ):
+                    response.raise_for_status()
+                    return response
+                delay = self.retry.delay(attempt, response.headers)
+                reason = response.status_code
+
+            if self.instrument is not None:
+                self.instrument.retry(endpoint(path), method)
+            logger.warning(f"{method} {path} failed ({reason}); retry in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method: str, path: str, data=None, params=None) -> Response:
+        clock = time.perf_counter
+        started = clock()
+        self.limiter.acquire(path)
+        waited = clock()
         url = self.api.url(path)
         headers = self.auth.header(method, self.api.path(path), self.timeout)
+        signed = clock()
 
         response = self.session.request(
             method=method.upper(),
@@ -89,34 +204,86 @@ class Client:
             params=params,
             timeout=self.timeout,
         )
-        response.raise_for_status()
+        if self.instrument is not None:
+            response = self._observe(method, path, response, started, waited, signed)
         return response
 
+    def _observe(self, method, path, response, started, waited, signed) -> Response:
+        received = time.perf_counter()
+        decoded = received
+        observed = response
+        if response.ok and response.content:
+            # Decode once here so the phase can be timed; the wrapper hands
+            # the parsed payload to later .json() calls.
+            try:
+                observed = DecodedResponse(response, response.json())
+                decoded = time.perf_counter()
+            except ValueError:
+                pass
+        self.instrument.request(
+            endpoint(path),
+            method,
+            response.status_code,
+            {
+                "wait": waited - started,
+                "sign": signed - waited,
+                "network": received - signed,
+                "decode": decoded - received,
+            },
+            sent=len(response.request.body or b"") if response.request else 0,
+            received=len(response.content or b""),
+        )
+        return observed
+
     def get(self, path: str, params=None) -> Response:
         return self._request("GET", path, params=params)
 
     def post(self, path: str, data=None) -> Response:
         return self._request("POST", path, data=data)
 
-    def paginate(self, path: str, key: str, params=None) -> Iterator[dict]:
-        seen = 0
-        params = params or {}
-        limit = params.get("limit", None)
+    def _pages(self, path: str, params: dict) -> Iterator[dict]:
+        pages = 0
         while True:
-            response = self.get(path, params=params).json()
-            items = response.get(key, [])
-
-            for item in items:
-                yield item
-                seen += 1
-                if limit is not None and seen >= limit:
-                    return
+            try:
+                response = self.get(path, params=params).json()
+            except requests.RequestException as error:
+                # Retries are exhausted; report where to pick the walk back up
+                raise PaginationError(path, params.get("cursor"), pages) from error
+            pages += 1
+            yield response
 
             if not response.get("has_next") or not response.get("cursor"):
-                break
+                return
 
             params = {**params, "cursor": response.get("cursor")}
 
+    def paginate(
+        self, path: str, key: str, params=None, prefetch: int = 0
+    ) -> Iterator[dict]:
+        """
+        Yield items from a cursor-paginated endpoint.
+
+        :param prefetch: Number of pages to fetch ahead on a worker thread.
+            0 (the default) fetches each page only after the previous one
+            has been consumed.
+        """
+        seen = 0
+        params = params or {}
+        limit = params.get("limit", None)
+        pages = self._pages(path, params)
+        if prefetch > 0:
+            pages = read_ahead(pages, prefetch, name="paginate")
+
+        try:
+            for response in pages:
+                for item in response.get(key, []):
+                    yield item
+                    seen += 1
+                    if limit is not None and seen >= limit:
+                        return
+        finally:
+            pages.close()
+
     def close(self) -> None:
         self.session.close()
 
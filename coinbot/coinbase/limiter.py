@@ -0,0 +1,115 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.limiter
+@brief Token-bucket rate limiting for the Coinbase Advanced REST API
+@license AGPL
+@ref https://docs.cdp.coinbase.com/advanced-trade/docs/rest-api-rate-limits
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        A thread-safe token bucket.
+
+        :param rate: Tokens added per second.
+        :param capacity: Maximum burst size. Defaults to one second of tokens.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be a positive number.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """
+        Seconds until `tokens` are available, without consuming anything.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            deficit = tokens - self._tokens
+        return max(0.0, deficit / self.rate)
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Take `tokens` if they are available.
+
+        :return: 0.0 on success, otherwise the seconds to wait before retrying.
+        """
+        if tokens > self.capacity:
+            raise ValueError("Cannot acquire more tokens than the bucket holds.")
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Block until `tokens` are taken.
+
+        :return: Total seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    # Requests per second allowed by Coinbase Advanced per API key / IP.
+    PUBLIC_RATE = 10
+    PRIVATE_RATE = 30
+
+    _shared: Optional["RateLimiter"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        public: Optional[TokenBucket] = None,
+        private: Optional[TokenBucket] = None,
+    ):
+        self.public = public or TokenBucket(self.PUBLIC_RATE)
+        self.private = private or TokenBucket(self.PRIVATE_RATE)
+
+    @classmethod
+    def shared(cls) -> "RateLimiter":
+        """
+        The process-wide limiter used by every client that is not given one.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def is_public(path: str) -> bool:
+        # Public market data lives under brokerage/market/...
+        return path.lstrip("/").startswith("market/")
+
+    def bucket(self, path: str) -> TokenBucket:
+        return self.public if self.is_public(path) else self.private
+
+    def wait_time(self, path: str) -> float:
+        return self.bucket(path).wait_time()
+
+    def try_acquire(self, path: str) -> float:
+        return self.bucket(path).try_acquire()
+
+    def acquire(self, path: str) -> float:
+        return self.bucket(path).acquire()
@@ -0,0 +1,189 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.metrics
+@brief Request instrumentation for the Coinbase Advanced clients
+@license AGPL
+@ref https://prometheus.io/docs/instrumenting/exposition_formats/
+
+Client and AsyncClient call an Instrument, if one is given, once per request
+with the time spent in each phase:
+
+- wait: blocked on the rate limiter
+- sign: building the JWT header
+- network: sending the request and reading the response
+- decode: parsing the JSON body
+
+Metrics is the in-process aggregator. It keeps fixed-bucket latency
+histograms per (endpoint, phase) and can be dumped as JSON or in the
+Prometheus text format.
+"""
+
+import json
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Optional
+
+PHASES = ("wait", "sign", "network", "decode")
+
+
+def endpoint(path: str) -> str:
+    """
+    Collapse identifiers in a path so metrics group by endpoint.
+
+    e.g. "products/BTC-USD/candles" -> "products/{id}/candles"
+    """
+    path = path.split("?", 1)[0].strip("/")
+    marker = "/brokerage/"
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    segments = [
+        (
+            "{id}"
+            if segment != segment.lower()
+            or "-" in segment
+            or any(c.isdigit() for c in segment)
+            else segment
+        )
+        for segment in path.split("/")
+    ]
+    return "/".join(segments)
+
+
+class Instrument:
+    """
+    The no-op hook. Subclass it to forward telemetry elsewhere.
+    """
+
+    def request(
+        self,
+        endpoint: str,
+        method: str,
+        status: Optional[int],
+        phases: dict[str, float],
+        sent: int = 0,
+        received: int = 0,
+    ) -> None:
+        pass
+
+    def retry(self, endpoint: str, method: str) -> None:
+        pass
+
+
+class Histogram:
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip([*map(str, self.BUCKETS), "+Inf"], self.counts)),
+        }
+
+
+class Metrics(Instrument):
+    def __init__(self, prefix: str = "coinbase"):
+        self.prefix = prefix
+        self.latency: dict[tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.statuses: dict[tuple[str, int], int] = defaultdict(int)
+        self.sent: dict[str, int] = defaultdict(int)
+        self.received: dict[str, int] = defaultdict(int)
+        self.retries: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        endpoint: str,
+        method: str,
+        status: Optional[int],
+        phases: dict[str, float],
+        sent: int = 0,
+        received: int = 0,
+    ) -> None:
+        name = f"{method.upper()} {endpoint}"
+        with self._lock:
+            for phase, seconds in phases.items():
+                self.latency[(name, phase)].observe(seconds)
+            self.latency[(name, "total")].observe(sum(phases.values()))
+            self.statuses[(name, status or 0)] += 1
+            self.sent[name] += sent
+            self.received[name] += received
+
+    def retry(self, endpoint: str, method: str) -> None:
+        with self._lock:
+            self.retries[f"{method.upper()} {endpoint}"] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            for table in (
+                self.latency,
+                self.statuses,
+                self.sent,
+                self.received,
+                self.retries,
+            ):
+                table.clear()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for (name, phase), histogram in self.latency.items():
+                entry = endpoints.setdefault(name, {"latency": {}})
+                entry["latency"][phase] = histogram.to_dict()
+            for (name, status), count in self.statuses.items():
+                endpoints[name].setdefault("status", {})[str(status)] = count
+            for name in endpoints:
+                endpoints[name]["bytes_sent"] = self.sent[name]
+                endpoints[name]["bytes_received"] = self.received[name]
+                endpoints[name]["retries"] = self.retries.get(name, 0)
+            return endpoints
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# TYPE {p}_request_seconds histogram",
+        ]
+        with self._lock:
+            for (name, phase), histogram in sorted(self.latency.items()):
+                method, path = name.split(" ", 1)
+                labels = f'method="{method}",endpoint="{path}",phase="{phase}"'
+                cumulative = 0
+                bounds = [*map(str, Histogram.BUCKETS), "+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{p}_request_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{p}_request_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{p}_request_seconds_count{{{labels}}} {histogram.count}")
+
+            lines.append(f"# TYPE {p}_responses_total counter")
+            for (name, status), count in sorted(self.statuses.items()):
+                method, path = name.split(" ", 1)
+                labels = f'method="{method}",endpoint="{path}",status="{status}"'
+                lines.append(f"{p}_responses_total{{{labels}}} {count}")
+
+            for metric, table in (
+                ("request_bytes_total", self.sent),
+                ("response_bytes_total", self.received),
+                ("retries_total", self.retries),
+            ):
+                lines.append(f"# TYPE {p}_{metric} counter")
+                for name, value in sorted(table.items()):
+                    method, path = name.split(" ", 1)
+                    labels = f'method="{method}",endpoint="{path}"'
+                    lines.append(f"{p}_{metric}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,135 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.quote
+@brief A coalescing best bid/ask quote service for Coinbase Advanced
+@license AGPL
+@ref https://docs.cdp.coinbase.com/advanced-trade/reference/retailbrokerageapi_getbestbidask
+
+Concurrent callers asking for overlapping products within a short window
+share a single Product.best_bid_ask request for the union of their
+product_ids. Results are cached for `ttl` seconds and every Quote reports
+how old it is.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from coinbot.coinbase.advanced import Product
+
+
+@dataclass
+class Quote:
+    product_id: str
+    bid: Optional[dict]  # {"price": str, "size": str}
+    ask: Optional[dict]
+    time: Optional[str]  # exchange timestamp of the pricebook
+    fetched: float  # time.monotonic() when the response arrived
+    cached: bool = False  # True when served from the cache
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched
+
+    def is_stale(self, ttl: float) -> bool:
+        return self.age > ttl
+
+
+@dataclass
+class _Batch:
+    product_ids: set = field(default_factory=set)
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[BaseException] = None
+
+
+class QuoteService:
+    def __init__(self, product: Product, window: float = 0.05, ttl: float = 1.0):
+        """
+        :param product: Product subscriber used for best_bid_ask.
+        :param window: Seconds to collect concurrent requests into one call.
+        :param ttl: Seconds a quote is served from the cache.
+        """
+        self.product = product
+        self.window = window
+        self.ttl = ttl
+        self.requests = 0  # upstream best_bid_ask calls
+        self._quotes: dict[str, Quote] = {}
+        self._batch: Optional[_Batch] = None
+        self._lock = threading.Lock()
+
+    def get(
+        self, product_ids: list[str], max_age: Optional[float] = None
+    ) -> dict[str, Quote]:
+        """
+        Quotes for product_ids, fetching only those older than max_age.
+
+        :param max_age: Oldest acceptable quote in seconds; defaults to ttl.
+        :return: Dictionary of Quote keyed by product_id. Products the
+            exchange did not return are absent.
+        """
+        if not product_ids:
+            raise ValueError("Must provide at least one product ID.")
+        max_age = self.ttl if max_age is None else max_age
+
+        with self._lock:
+            missing = {
+                product_id
+                for product_id in product_ids
+                if product_id not in self._quotes
+                or self._quotes[product_id].is_stale(max_age)
+            }
+            if missing:
+                leader = self._batch is None
+                if leader:
+                    self._batch = _Batch()
+                batch = self._batch
+                batch.product_ids |= missing
+
+        if missing:
+            if leader:
+                self._flush(batch)
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+
+        with self._lock:
+            return {
+                product_id: replace(
+                    self._quotes[product_id], cached=product_id not in missing
+                )
+                for product_id in product_ids
+                if product_id in self._quotes
+            }
+
+    def invalidate(self, product_ids: Optional[list[str]] = None) -> None:
+        with self._lock:
+            for product_id in product_ids or list(self._quotes):
+                self._quotes.pop(product_id, None)
+
+    def _flush(self, batch: _Batch) -> None:
+        time.sleep(self.window)  # let concurrent callers join the batch
+        with self._lock:
+            self._batch = None
+            product_ids = sorted(batch.product_ids)
+
+        try:
+            self.requests += 1
+            response = self.product.best_bid_ask(product_ids)
+            fetched = time.monotonic()
+            quotes = {}
+            for book in response.get("pricebooks", []):
+                bids, asks = book.get("bids") or [None], book.get("asks") or [None]
+                quotes[book["product_id"]] = Quote(
+                    product_id=book["product_id"],
+                    bid=bids[0],
+                    ask=asks[0],
+                    time=book.get("time"),
+                    fetched=fetched,
+                )
+            with self._lock:
+                self._quotes.update(quotes)
+        except Exception as error:  # surfaced to every waiter
+            batch.error = error
+        finally:
+            batch.done.set()
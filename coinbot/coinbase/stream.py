@@ -0,0 +1,311 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.stream
+@brief A WebSocket Market Data Adapter for Coinbase Advanced
+@license AGPL
+@ref https://docs.cdp.coinbase.com/advanced-trade/docs/ws-channels
+
+Subscribes to the level2 and ticker channels and keeps an in-memory L2 book
+per product. Every message carries a connection-wide sequence_num; a gap
+means updates were lost, so the level2 subscription is renewed to receive a
+fresh snapshot.
+
+Recorded sessions (one raw JSON message per line) can be replayed through
+MarketStream.replay, or served from a local WebSocket server and consumed by
+pointing `url` at it.
+"""
+
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from typing import Iterable, Optional, Union
+
+import websocket
+from cdp.auth.utils.jwt import JwtOptions, generate_jwt
+
+from coinbot.coinbase.client import Auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class BookSide:
+    def __init__(self, descending: bool = False):
+        """
+        One side of an L2 book.
+
+        :param descending: True for bids, where the best price is the highest.
+        """
+        self.descending = descending
+        self.prices: list[Decimal] = []  # ascending
+        self.sizes: dict[Decimal, Decimal] = {}
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def clear(self) -> None:
+        self.prices.clear()
+        self.sizes.clear()
+
+    def update(self, price: Decimal, size: Decimal) -> None:
+        if not size:
+            if self.sizes.pop(price, None) is not None:
+                del self.prices[bisect_left(self.prices, price)]
+        else:
+            if price not in self.sizes:
+                insort(self.prices, price)
+            self.sizes[price] = size
+
+    @property
+    def best(self) -> Optional[tuple[Decimal, Decimal]]:
+        if not self.prices:
+            return None
+        price = self.prices[-1] if self.descending else self.prices[0]
+        return price, self.sizes[price]
+
+    def size(self, price: Decimal) -> Decimal:
+        return self.sizes.get(price, Decimal(0))
+
+    def rank(self, price: Decimal) -> int:
+        """
+        Number of levels priced strictly better than `price`.
+        """
+        if self.descending:
+            return len(self.prices) - bisect_right(self.prices, price)
+        return bisect_left(self.prices, price)
+
+    def levels(self, depth: Optional[int] = None) -> list[tuple[Decimal, Decimal]]:
+        """
+        The best `depth` levels as (price, size), best first.
+        """
+        count = len(self.prices) if depth is None else min(depth, len(self.prices))
+        if self.descending:
+            prices = self.prices[len(self.prices) - count :][::-1]
+        else:
+            prices = self.prices[:count]
+        return [(price, self.sizes[price]) for price in prices]
+
+
+class OrderBook:
+    def __init__(self, product_id: str):
+        self.product_id = product_id
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide()
+        self.ready = False  # True once a snapshot has been applied
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"OrderBook({self.product_id}, bid={self.best_bid}, ask={self.best_ask})"
+
+    def side(self, name: str) -> BookSide:
+        return self.bids if name in ("bid", "buy") else self.asks
+
+    def snapshot(self, updates: Iterable[dict]) -> None:
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            self._apply(updates)
+            self.ready = True
+
+    def apply(self, updates: Iterable[dict]) -> None:
+        with self._lock:
+            self._apply(updates)
+
+    def reset(self) -> None:
+        """
+        Drop every level until the next snapshot; the book reads as empty.
+        """
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            self.ready = False
+
+    def _apply(self, updates: Iterable[dict]) -> None:
+        for update in updates:
+            self.side(update["side"]).update(
+                Decimal(update["price_level"]), Decimal(update["new_quantity"])
+            )
+
+    @property
+    def best_bid(self) -> Optional[tuple[Decimal, Decimal]]:
+        with self._lock:
+            return self.bids.best
+
+    @property
+    def best_ask(self) -> Optional[tuple[Decimal, Decimal]]:
+        with self._lock:
+            return self.asks.best
+
+    @property
+    def spread(self) -> Optional[Decimal]:
+        with self._lock:
+            bid, ask = self.bids.best, self.asks.best
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def depth(self, side: str, levels: Optional[int] = None) -> list:
+        with self._lock:
+            return self.side(side).levels(levels)
+
+    def rank(self, side: str, price: Union[str, Decimal]) -> int:
+        with self._lock:
+            return self.side(side).rank(Decimal(price))
+
+
+class MarketStream:
+    def __init__(
+        self,
+        product_ids: list[str],
+        channels: Iterable[str] = ("level2", "ticker"),
+        url: str = "wss://advanced-trade-ws.coinbase.com",
+        auth: Optional[Auth] = None,
+        record: Optional[str] = None,
+    ):
+        """
+        :param product_ids: Products to subscribe to (e.g., BTC-USD).
+        :param channels: Channels to subscribe to; heartbeats is always added.
+        :param url: WebSocket endpoint. Point at a local server for replays.
+        :param auth: Optional Auth used to sign subscriptions.
+        :param record: Optional file to append every raw message to.
+        """
+        if not product_ids:
+            raise ValueError("Must provide at least one product ID.")
+        self.product_ids = list(product_ids)
+        self.channels = list(channels)
+        self.url = url
+        self.auth = auth
+        self.record = record
+        self.books = {product_id: OrderBook(product_id) for product_id in product_ids}
+        self.tickers: dict[str, dict] = {}
+        self.sequence: Optional[int] = None
+        self.gaps = 0
+        self._app: Optional[websocket.WebSocketApp] = None
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+    def message(self, kind: str, channel: str) -> dict:
+        message = {"type": kind, "product_ids": self.product_ids, "channel": channel}
+        if self.auth is not None:
+            message["jwt"] = generate_jwt(
+                JwtOptions(
+                    api_key_id=self.auth.api.key,
+                    api_key_secret=self.auth.api.secret,
+                )
+            )
+        return message
+
+    def send(self, message: dict) -> None:
+        if self._app is not None and self._app.sock is not None:
+            self._app.send(json.dumps(message))
+
+    def subscribe(self) -> None:
+        for channel in self.channels + ["heartbeats"]:
+            self.send(self.message("subscribe", channel))
+
+    def resync(self) -> None:
+        """
+        Discard the books and request a fresh level2 snapshot.
+        """
+        logger.warning(f"Sequence gap detected; resyncing {self.product_ids}")
+        self.gaps += 1
+        for book in self.books.values():
+            book.reset()
+        if "level2" in self.channels:
+            self.send(self.message("unsubscribe", "level2"))
+            self.send(self.message("subscribe", "level2"))
+
+    def handle(self, message: Union[str, dict]) -> None:
+        """
+        Apply one raw message to the in-memory state.
+        """
+        if isinstance(message, str):
+            if self._file is not None:
+                self._file.write(message.rstrip("\n") + "\n")
+            message = json.loads(message)
+
+        if message.get("type") == "error":
+            logger.error(f"Stream error: {message.get('message')}")
+            return
+
+        sequence = message.get("sequence_num")
+        if sequence is not None:
+            gap = self.sequence is not None and sequence != self.sequence + 1
+            self.sequence = sequence
+            if gap:
+                self.resync()
+                return
+
+        channel = message.get("channel")
+        for event in message.get("events", []):
+            if channel == "l2_data":
+                book = self.books.get(event.get("product_id"))
+                if book is None:
+                    continue
+                if event.get("type") == "snapshot":
+                    book.snapshot(event.get("updates", []))
+                elif book.ready:
+                    book.apply(event.get("updates", []))
+            elif channel == "ticker":
+                for ticker in event.get("tickers", []):
+                    self.tickers[ticker["product_id"]] = ticker
+
+    def replay(self, path: str) -> int:
+        """
+        Feed a recorded session (one JSON message per line) through handle.
+
+        :return: Number of messages replayed.
+        """
+        count = 0
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    self.handle(json.loads(line))
+                    count += 1
+        return count
+
+    def start(self) -> None:
+        """
+        Connect and process messages on a background thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.record:
+            self._file = open(self.record, "a")
+        self.sequence = None
+        self._app = websocket.WebSocketApp(
+            self.url,
+            on_open=lambda app: self.subscribe(),
+            on_message=lambda app, message: self.handle(message),
+            on_error=lambda app, error: logger.error(f"WebSocket error: {error}"),
+        )
+        self._thread = threading.Thread(
+            target=self._app.run_forever, name="market-stream", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5) -> None:
+        if self._app is not None:
+            self._app.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def best_bid_ask(self, product_id: str) -> dict:
+        """
+        The best bid and ask of a product from the local book, in O(1).
+
+        While the book waits for a snapshot, e.g. after a sequence gap, ready
+        is False and bid and ask are None.
+        """
+        book = self.books[product_id]
+        return {
+            "product_id": product_id,
+            "ready": book.ready,
+            "bid": book.best_bid,
+            "ask": book.best_ask,
+        }
@@ -0,0 +1,150 @@
+"""
+Copyright (C) 2021 - 2025 Austin Berrio
+@file coinbot.coinbase.transport
+@brief Connection pooling and retry policy for the Coinbase Advanced client
+@license AGPL
+@ref https://docs.cdp.coinbase.com/advanced-trade/docs/rest-api-rate-limits
+"""
+
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator, Mapping, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 5
+    backoff: float = 0.5  # base delay in seconds, doubled per attempt
+    cap: float = 30.0  # longest delay between attempts
+    statuses: tuple = (429, 500, 502, 503, 504)
+    # Only idempotent methods are retried on 5xx and connection errors.
+    # A 429 means the request was rejected unprocessed, so any method retries.
+    idempotent: tuple = ("GET", "HEAD", "OPTIONS")
+
+    def can_retry(self, method: str, status: Optional[int] = None) -> bool:
+        if status == 429:
+            return True
+        if status is not None and status not in self.statuses:
+            return False
+        return method.upper() in self.idempotent
+
+    def delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """
+        Seconds to sleep before retry number `attempt` (0-based).
+
+        Uses full-jitter exponential backoff, but never less than what
+        Retry-After or the rate-limit reset headers ask for.
+        """
+        jitter = random.uniform(0, min(self.cap, self.backoff * 2**attempt))
+        hint = self.hint(headers or {})
+        return jitter if hint is None else min(self.cap, hint) + jitter / 10
+
+    @staticmethod
+    def hint(headers: Mapping[str, str]) -> Optional[float]:
+        value = headers.get("Retry-After")
+        if value is not None:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:  # HTTP-date form
+                    return max(
+                        0.0, parsedate_to_datetime(value).timestamp() - time.time()
+                    )
+                except (TypeError, ValueError):
+                    return None
+
+        for name in ("x-ratelimit-reset", "ratelimit-reset"):
+            value = headers.get(name)
+            if value is None:
+                continue
+            try:
+                reset = float(value)
+            except ValueError:
+                continue
+            # Either an epoch timestamp or seconds remaining
+            return max(0.0, reset - time.time()) if reset > 1e9 else max(0.0, reset)
+        return None
+
+
+def create_session(
+    pool_connections: int = 10, pool_maxsize: int = 32
+) -> requests.Session:
+    """
+    A requests.Session with a sized connection pool.
+
+    Retries are left to the Client so that every attempt is re-signed and
+    passes through the rate limiter.
+
+    :param pool_connections: Number of host pools to cache.
+    :param pool_maxsize: Keep-alive connections kept per host; size it to the
+        number of threads sharing the client.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def read_ahead(items: Iterable[T], depth: int, name: str = "read-ahead") -> Iterator[T]:
+    """
+    Produce items on a worker thread, at most `depth` ahead of the consumer.
+
+    The worker overlaps slow producers, e.g. paginated requests, with the
+    consumer's work. An exception in the worker is re-raised to the consumer.
+    Closing the returned generator stops the worker and closes `items`.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            for item in items:
+                if not put(item):
+                    break
+            else:
+                put(done)
+        except Exception as error:  # handed to the consumer to re-raise
+            put(error)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=worker, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Unblock a worker stuck on a full queue; it exits after any
+        # item already being produced.
+        stop.set()
+        while not buffer.empty():
+            buffer.get_nowait()
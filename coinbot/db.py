@@ -1,10 +1,17 @@
 """
 coinbot/model/database.py
 """
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
 from functools import wraps
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set
 
+import numpy as np
 from peewee import (
+    AutoField,
     CharField,
     DateTimeField,
     DecimalField,
@@ -15,6 +22,49 @@ from peewee import (
 )
 
 from coinbot import logging
+from coinbot.coinbase.candles import Timestamp, to_unix
+
+# Connection profile applied to every new connection.
+# - journal_mode: WAL lets readers work while the writer commits
+# - synchronous: NORMAL syncs at checkpoints instead of every commit; safe
+#   under WAL, though the last commits may roll back after a power loss
+# - cache_size: page cache per connection; negative values are in KiB
+# - mmap_size: bytes of the file read through memory mapping
+# - temp_store: keep temporary tables and indices in memory
+PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+
+# Pragmas that only tune the connection and so apply to read-only handles
+READ_PRAGMAS = ("cache_size", "mmap_size", "temp_store")
+
+# NumPy type of every va_ column returned by query; date is UNIX seconds
+COLUMN_TYPES = {
+    "id": np.int64,
+    "exchange": object,
+    "date": np.int64,
+    "market_price": np.float64,
+    "current_target": np.float64,
+    "current_value": np.float64,
+    "trade_amount": np.float64,
+    "total_trade_amount": np.float64,
+    "order_size": np.float64,
+    "total_order_size": np.float64,
+    "interval": np.int64,
+}
+
+
+# Table prefix of each strategy's ledger and the integer columns it adds
+TABLE_PREFIXES = {"va": (), "ca": (), "dca": ("multiplier",)}
+
+
+def _in_memory(database: str) -> bool:
+    # Each connection to these gets a private database
+    return database in ("", ":memory:") or "mode=memory" in database
 
 
 def ensure_db_connection(method):
@@ -40,75 +90,502 @@ def close_db_after_use(method):
     return wrapper
 
 
+class BufferedWriter:
+    def __init__(
+        self,
+        db: SqliteDatabase,
+        size: int = 10000,
+        interval: float = 1.0,
+        keep_ids: bool = False,
+        backoff: float = 60.0,
+    ):
+        """
+        Collect rows and write them in a single transaction.
+
+        Rows are flushed when `size` rows are pending, when the oldest pending
+        row is `interval` seconds old, and on flush or close. A timer started
+        with the first pending row flushes a quiet buffer once it is due. If
+        a flush fails its rows stay pending and the next timed attempt waits
+        twice as long as the last, up to `backoff` seconds.
+
+        Timed flushes run on another thread, so they are off for in-memory
+        databases with per-thread connections: that thread would see its own
+        empty database.
+
+        :param db: Database the rows are written to.
+        :param size: Pending rows that trigger a flush.
+        :param interval: Seconds a row may wait before a flush is triggered.
+        :param keep_ids: Write the rows' primary keys instead of letting
+            SQLite assign them, e.g. when copying records back in.
+        :param backoff: Longest wait in seconds before retrying a failed flush.
+        """
+        self.db = db
+        self.size = size
+        self.interval = interval
+        self.keep_ids = keep_ids
+        self.backoff = backoff
+        self.timed = not (_in_memory(db.database) and db.thread_safe)
+        self.pending = 0
+        self.written = 0
+        self._rows: Dict[Model, list] = {}
+        self._fields: Dict[Model, list] = {}
+        self._statements: Dict[Model, str] = {}
+        self._oldest: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._retry: Optional[float] = None  # wait after the last failure
+        self._retry_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+    def _prepare(self, model: Model) -> list:
+        fields = self._fields.get(model)
+        if fields is None:
+            fields = [
+                field
+                for field in model._meta.sorted_fields
+                if self.keep_ids or not isinstance(field, AutoField)
+            ]
+            # One parameterized INSERT, reused for every row of the model
+            sql, _ = model.insert({field: None for field in fields}).sql()
+            self._fields[model], self._statements[model] = fields, sql
+        return fields
+
+    def add(self, model: Model, row: dict) -> None:
+        self.extend(model, [row])
+
+    def extend(self, model: Model, rows: Iterable[dict]) -> None:
+        fields = self._prepare(model)
+        values = [
+            tuple(field.db_value(row[field.name]) for field in fields) for row in rows
+        ]
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._rows.setdefault(model, []).extend(values)
+            self.pending += len(values)
+            due = self.pending >= self.size or time.monotonic() >= self._due()
+            if not due:
+                self._schedule()
+        if due:
+            self.flush()
+
+    def _due(self) -> float:
+        # Called with the lock held; when the pending rows should be written
+        if self._retry_at is not None:
+            return self._retry_at
+        return self._oldest + self.interval
+
+    def _schedule(self) -> None:
+        # Called with the lock held; one timer covers the oldest pending row
+        if not self.timed:
+            return
+        if self._timer is not None and self._timer.is_alive():
+            return
+        delay = max(0.0, self._due() - time.monotonic())
+        self._timer = threading.Timer(delay, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _expire(self) -> None:
+        with self._lock:
+            if self._oldest is None:
+                return
+            due = time.monotonic() >= self._due()
+            if not due:
+                self._timer = None
+                self._schedule()
+                return
+        # The timer thread gets its own connection unless it is shared
+        opened = self.db.is_closed()
+        try:
+            self.flush()
+        except Exception as error:
+            logging.error(f"Timed flush to {self.db.database} failed: {error}")
+        finally:
+            if opened and not self.db.is_closed():
+                self.db.close()
+
+    def flush(self) -> int:
+        """
+        Write every pending row in one transaction.
+
+        :return: Number of rows written.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, {}
+            count, self.pending = self.pending, 0
+            oldest, self._oldest = self._oldest, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not count:
+            return 0
+
+        try:
+            with self.db.atomic():
+                cursor = self.db.cursor()
+                for model, values in rows.items():
+                    cursor.executemany(self._statements[model], values)
+        except Exception:
+            # Rolled back: put the rows ahead of any added since the swap
+            with self._lock:
+                for model, values in rows.items():
+                    values.extend(self._rows.get(model, []))
+                    self._rows[model] = values
+                self.pending += count
+                self._oldest = oldest
+                # Back off so a persistent error is not retried in a loop
+                self._retry = min(2 * (self._retry or self.interval), self.backoff)
+                self._retry_at = time.monotonic() + self._retry
+                self._schedule()
+            raise
+        with self._lock:
+            self._retry = self._retry_at = None
+        self.written += count
+        logging.info(f"Flushed {count} rows to {self.db.database}.")
+        return count
+
+
 class ValueAveragingDatabase:
-    def __init__(self, db_name: Optional[str] = None):
+    def __init__(
+        self,
+        db_name: Optional[str] = None,
+        pragmas: Optional[dict] = None,
+        thread_safe: bool = True,
+        readonly: bool = False,
+    ):
+        """
+        :param db_name: SQLite file. Default is value_averaging.sqlite.
+        :param pragmas: Connection profile. Default is PRAGMAS; pass {} for
+            SQLite's own defaults.
+        :param thread_safe: True opens one connection per thread, kept open
+            until closed. False shares a single connection across threads.
+        :param readonly: Open the file read-only; see replica.
+        """
         self.db_name = db_name or "value_averaging.sqlite"
-        self.db = SqliteDatabase(self.db_name)
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self.thread_safe = thread_safe
+        self.readonly = readonly
+
+        if readonly:
+            database = f"file:{os.path.abspath(self.db_name)}?mode=ro"
+            pragmas = {
+                key: value for key, value in self.pragmas.items() if key in READ_PRAGMAS
+            }
+            params = {"uri": True}
+        else:
+            database, pragmas, params = self.db_name, self.pragmas, {}
+        self.db = SqliteDatabase(
+            database,
+            pragmas=pragmas,
+            thread_safe=thread_safe,
+            check_same_thread=thread_safe,
+            **params,
+        )
+        self._writer: Optional[BufferedWriter] = None
+        self._models: Dict[str, Model] = {}  # model class per table name
+        self._tables: Optional[Set[str]] = None  # tables found in the file
+        self._indexes: Set[str] = set()  # and their indexes
+        self._lock = threading.RLock()
 
     def connect(self) -> bool:
         try:
-            return self.db.connect()
+            # Connections are long-lived; connecting again keeps the open one
+            return self.db.connect(reuse_if_open=True)
         except OperationalError as message:
             logging.exception(message)
-            logging.warning(f"Connection already exists: {self.db_name}")
+            logging.warning(f"Failed to connect: {self.db_name}")
         return False
 
+    def replica(self) -> "ValueAveragingDatabase":
+        """
+        A read-only handle on the same file with the same profile.
+
+        Under WAL its readers see the last committed state and never block,
+        or are blocked by, the writer. The file must already exist.
+        """
+        return ValueAveragingDatabase(
+            self.db_name, self.pragmas, self.thread_safe, readonly=True
+        )
+
     def close(self) -> bool:
+        if self._writer is not None:
+            self._writer.flush()
         return self.db.close()
 
-    def _create_value_averaging_model(self, asset_name: str) -> Model:
+    def writer(
+        self, size: Optional[int] = None, interval: Optional[float] = None
+    ) -> BufferedWriter:
+        """
+        The database's buffered writer, created on first use.
+
+        Pending rows are flushed on close. A size or interval passed here
+        replaces the writer's current one.
+        """
+        if self._writer is None:
+            self._writer = BufferedWriter(self.db)
+        if size is not None:
+            self._writer.size = size
+        if interval is not None:
+            self._writer.interval = interval
+        return self._writer
+
+    def _create_value_averaging_model(
+        self, asset_name: str, prefix: str = "va"
+    ) -> Model:
+        if prefix not in TABLE_PREFIXES:
+            raise ValueError(f"Unknown table prefix: {prefix}")
         db = self.db
+        table_name = f"{prefix}_{asset_name.lower()}"
 
-        class ValueAveragingRecord(Model):
-            exchange = CharField()
-            date = DateTimeField()
-            market_price = DecimalField()
-            current_target = DecimalField()
-            current_value = DecimalField()
-            trade_amount = DecimalField()
-            total_trade_amount = DecimalField()
-            order_size = DecimalField()
-            total_order_size = DecimalField()
-            interval = IntegerField()
+        # One class per table, so every caller shares the same model
+        with self._lock:
+            model = self._models.get(table_name)
+            if model is not None:
+                return model
 
-            class Meta:
-                database = db
-                db_table = f"va_{asset_name.lower()}"
+            class ValueAveragingRecord(Model):
+                exchange = CharField()
+                date = DateTimeField()
+                market_price = DecimalField()
+                current_target = DecimalField()
+                current_value = DecimalField()
+                trade_amount = DecimalField()
+                total_trade_amount = DecimalField()
+                order_size = DecimalField()
+                total_order_size = DecimalField()
+                interval = IntegerField()
 
-        return ValueAveragingRecord
+                class Meta:
+                    database = db
+                    db_table = table_name
+
+            for name in TABLE_PREFIXES[prefix]:
+                ValueAveragingRecord._meta.add_field(name, IntegerField(default=1))
+            # Named after the table; index names are global to the file
+            for field in ("date", "interval"):
+                ValueAveragingRecord.add_index(
+                    getattr(ValueAveragingRecord, field), name=f"{table_name}_{field}"
+                )
+            self._models[table_name] = ValueAveragingRecord
+            return ValueAveragingRecord
 
     @ensure_db_connection
-    def get_model(self, table_name: str) -> Model:
-        model = self._create_value_averaging_model(table_name)
-        if self.db.table_exists(model._meta.table_name):
-            logging.info(f"Table {model._meta.table_name} already exists.")
-        else:
-            try:
-                self.db.create_tables([model])
-                logging.info(f"Table {model._meta.table_name} created.")
-            except OperationalError as message:
-                logging.exception(message)
-                logging.warning(f"Table existence is ambiguous: {table_name}")
-        return model
+    def tables(self, refresh: bool = False) -> Set[str]:
+        """
+        Names of the tables in the file, read with a single sqlite_master
+        query and cached along with the index names. Tables and indexes
+        created through this object are added.
+
+        :param refresh: Query sqlite_master again, e.g. after another
+            process created tables.
+        """
+        with self._lock:
+            if self._tables is None or refresh:
+                cursor = self.db.execute_sql(
+                    "SELECT type, name FROM sqlite_master "
+                    "WHERE type IN ('table', 'index')"
+                )
+                schema = cursor.fetchall()
+                self._tables = {name for kind, name in schema if kind == "table"}
+                self._indexes = {name for kind, name in schema if kind == "index"}
+            return self._tables
+
+    def assets(self) -> List[str]:
+        """
+        Asset names of the va_ tables in the file.
+        """
+        return sorted(name[3:] for name in self.tables() if name.startswith("va_"))
 
     @ensure_db_connection
-    def get_models(self, table_names: List[str]) -> List[Model]:
-        models = []
-        new_models = []
+    def get_model(self, table_name: str, prefix: str = "va") -> Model:
+        return self.get_models([table_name], prefix)[0]
 
-        for table_name in table_names:
-            model = self._create_value_averaging_model(table_name)
-            models.append(model)
+    @ensure_db_connection
+    def get_models(self, table_names: List[str], prefix: str = "va") -> List[Model]:
+        """
+        The models of the named assets, creating missing tables.
 
-        for model in models:
-            if self.db.table_exists(model._meta.table_name):
-                new_models.append(model)
-        try:
-            if new_models:
-                self.db.create_tables(new_models)
-                logging.info(f"Tables for {new_models} created.")
-        except OperationalError as message:
-            logging.exception(message)
-            logging.warning(f"Tables existence is ambiguous: {table_names}")
+        :param prefix: Strategy table prefix; see TABLE_PREFIXES.
+        """
+        models = [
+            self._create_value_averaging_model(name, prefix) for name in table_names
+        ]
+
+        with self._lock:
+            tables = self.tables()
+            new_models = {
+                model._meta.table_name: model
+                for model in models
+                if model._meta.table_name not in tables
+            }
+            # Tables created before the date and interval indexes existed
+            unindexed = [
+                model
+                for model in models
+                if model._meta.table_name in tables
+                and not self._index_names(model) <= self._indexes
+            ]
+            if not new_models and not unindexed:
+                logging.info(f"Tables for {table_names} already exist.")
+            elif self.readonly:
+                if new_models:
+                    logging.warning(f"Tables {list(new_models)} do not exist.")
+            else:
+                try:
+                    with self.db.atomic():
+                        self.db.create_tables(list(new_models.values()))
+                        for model in unindexed:
+                            model._schema.create_indexes(safe=True)
+                    tables.update(new_models)
+                    for model in [*new_models.values(), *unindexed]:
+                        self._indexes.update(self._index_names(model))
+                    logging.info(f"Tables {list(new_models)} created.")
+                except OperationalError as message:
+                    logging.exception(message)
+                    logging.warning(f"Tables existence is ambiguous: {table_names}")
 
         return models
+
+    @staticmethod
+    def _index_names(model: Model) -> Set[str]:
+        return {index._name for index in model._meta.fields_to_index()}
+
+    @ensure_db_connection
+    def query(
+        self,
+        asset_name: str,
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+        columns: Optional[Sequence[str]] = None,
+        chunk: int = 10000,
+        after: Optional[int] = None,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Stream an asset's records dated in [start, end) as NumPy columns,
+        `chunk` rows at a time, in date order.
+
+        Rows go from the cursor straight into typed arrays; see COLUMN_TYPES.
+        The range is answered from the date index, so the cost follows the
+        slice, not the table. Dates are compared as stored, in UTC.
+
+        :param start: First date, inclusive. Default is the first record.
+        :param end: Last date, exclusive. Default is past the last record.
+        :param columns: Columns to return. Default is every column.
+        :param after: Only return records with a greater id, e.g. the last
+            id already copied elsewhere.
+        """
+        columns = list(columns or COLUMN_TYPES)
+        unknown = set(columns) - set(COLUMN_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+
+        table = self._create_value_averaging_model(asset_name)._meta.table_name
+        if table not in self.tables():
+            logging.warning(f"Table {table} does not exist.")
+            return
+
+        sql, params = self._select(table, columns, start, end, after)
+        cursor = self.db.execute_sql(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                return
+            values = list(zip(*rows))
+            yield {
+                name: np.array(values[i], dtype=COLUMN_TYPES[name])
+                for i, name in enumerate(columns)
+            }
+
+    def read(
+        self,
+        asset_name: str,
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+        columns: Optional[Sequence[str]] = None,
+        chunk: int = 10000,
+    ) -> Dict[str, np.ndarray]:
+        """
+        query collected into whole columns, allocated once from a count of
+        the range so peak memory stays near the size of the result.
+        """
+        columns = list(columns or COLUMN_TYPES)
+        table = self._create_value_averaging_model(asset_name)._meta.table_name
+        size = 0
+        if table in self.tables():
+            sql, params = self._select(table, ["id"], start, end)
+            count = f"SELECT COUNT(*) FROM ({sql})"
+            size = self.db.execute_sql(count, params).fetchone()[0]
+
+        result = {name: np.empty(size, dtype=COLUMN_TYPES[name]) for name in columns}
+        offset = 0
+        for part in self.query(asset_name, start, end, columns, chunk):
+            # Rows committed after the count are left out
+            length = min(len(part[columns[0]]), size - offset)
+            for name in columns:
+                result[name][offset : offset + length] = part[name][:length]
+            offset += length
+            if offset == size:
+                break
+        return {name: values[:offset] for name, values in result.items()}
+
+    def frame(
+        self,
+        asset_name: str,
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+        columns: Optional[Sequence[str]] = None,
+        chunk: int = 10000,
+    ):
+        """
+        read as a pandas DataFrame with date as UTC datetimes.
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame(self.read(asset_name, start, end, columns, chunk))
+        if "date" in frame:
+            frame["date"] = pd.to_datetime(frame["date"], unit="s", utc=True)
+        return frame
+
+    @staticmethod
+    def _select(
+        table: str,
+        columns: Sequence[str],
+        start: Optional[Timestamp],
+        end: Optional[Timestamp],
+        after: Optional[int] = None,
+    ) -> tuple[str, list]:
+        # Dates are stored as text like "2020-01-01 00:00:00+00:00"; bounds in
+        # the same layout compare correctly and can use the date index
+        def stored(value: Timestamp) -> str:
+            moment = datetime.fromtimestamp(to_unix(value), timezone.utc)
+            return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+        expressions = [
+            (
+                "CAST(strftime('%s', \"date\") AS INTEGER)"
+                if name == "date"
+                else f'"{name}"'
+            )
+            for name in columns
+        ]
+        where, params = [], []
+        if start is not None:
+            where.append('"date" >= ?')
+            params.append(stored(start))
+        if end is not None:
+            where.append('"date" < ?')
+            params.append(stored(end))
+        if after is not None:
+            where.append('"id" > ?')
+            params.append(after)
+
+        sql = f'SELECT {", ".join(expressions)} FROM "{table}"'
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        return sql + ' ORDER BY "date", "id"', params
@@ -0,0 +1,277 @@
+"""
+coinbot/ledger.py
+
+Columnar HDF5 copies of the strategy ledgers kept in va_<asset> tables.
+
+Each asset is a group holding one chunked, compressed, resizable dataset per
+column. Exports are incremental: only records with an id past the group's
+last_id are read from SQLite and appended. Reads slice the datasets, so only
+the chunks covering the requested dates are decompressed.
+
+Layout:
+
+    <path>
+        /<ASSET>/
+            id exchange date market_price current_target current_value
+            trade_amount total_trade_amount order_size total_order_size
+            interval
+            attrs: table, rows, last_id, sorted
+
+Dates are UNIX seconds. A group's rows attribute is updated after every
+column has been appended, so an interrupted export leaves the previous rows
+readable and the next export overwrites the partial tail.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import click
+import h5py
+import numpy as np
+
+from coinbot import logging
+from coinbot.coinbase.candles import Timestamp, to_unix
+from coinbot.db import COLUMN_TYPES, BufferedWriter, ValueAveragingDatabase
+
+# Exchange names are short; fixed width keeps the column compressible
+EXCHANGE_TYPE = "S32"
+
+
+def _dtype(name: str):
+    return EXCHANGE_TYPE if name == "exchange" else COLUMN_TYPES[name]
+
+
+class LedgerStore:
+    def __init__(
+        self,
+        path: str = "ledger.h5",
+        chunk: int = 65536,
+        compression: str = "gzip",
+        level: int = 4,
+    ):
+        """
+        :param path: HDF5 file holding the ledgers.
+        :param chunk: Rows per HDF5 chunk.
+        :param compression: h5py compression filter.
+        :param level: Compression level for gzip.
+        """
+        self.path = path
+        self.chunk = chunk
+        self.compression = compression
+        self.level = level
+
+    def assets(self) -> List[str]:
+        try:
+            with h5py.File(self.path, "r") as f:
+                return sorted(f.keys())
+        except FileNotFoundError:
+            return []
+
+    def last_id(self, asset_name: str) -> int:
+        """
+        The id of the last record exported for the asset, 0 if none.
+        """
+        try:
+            with h5py.File(self.path, "r") as f:
+                group = f.get(asset_name.upper())
+                return 0 if group is None else int(group.attrs["last_id"])
+        except FileNotFoundError:
+            return 0
+
+    def export(
+        self,
+        db: ValueAveragingDatabase,
+        assets: Optional[Sequence[str]] = None,
+        batch: int = 100000,
+    ) -> Dict[str, int]:
+        """
+        Append every record not yet exported, `batch` rows at a time.
+
+        :param assets: Assets to export. Default is every va_ table.
+        :return: Rows appended per asset.
+        """
+        assets = db.assets() if assets is None else assets
+        appended = {}
+        with h5py.File(self.path, "a") as f:
+            for asset in assets:
+                group = self._group(f, asset, db)
+                count = 0
+                after = int(group.attrs["last_id"])
+                for columns in db.query(asset, chunk=batch, after=after):
+                    count += self._append(group, columns)
+                appended[asset] = count
+                logging.info(f"Exported {count} records of {asset} to {self.path}")
+        return appended
+
+    def load(
+        self,
+        asset_name: str,
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Read an asset's records dated in [start, end).
+
+        Dates are searched in memory, then every other column is sliced, so
+        only its chunks in the range are read. If records were exported out
+        of date order the group is marked unsorted and every row is filtered.
+
+        :param columns: Columns to return. Default is every column.
+        """
+        columns = list(columns or COLUMN_TYPES)
+        with h5py.File(self.path, "r") as f:
+            group = f.get(asset_name.upper())
+            if group is None:
+                return {name: np.empty(0, dtype=_dtype(name)) for name in columns}
+
+            rows = int(group.attrs["rows"])
+            if start is None and end is None:
+                return {name: group[name][:rows] for name in columns}
+
+            dates = group["date"][:rows]
+            if not group.attrs.get("sorted", True):
+                # Out of order appends: filter every row instead of bisecting
+                mask = np.ones(rows, dtype=bool)
+                if start is not None:
+                    mask &= dates >= to_unix(start)
+                if end is not None:
+                    mask &= dates < to_unix(end)
+                return {name: group[name][:rows][mask] for name in columns}
+
+            lo, hi = 0, rows
+            if start is not None:
+                lo = int(np.searchsorted(dates, to_unix(start)))
+            if end is not None:
+                hi = int(np.searchsorted(dates, to_unix(end)))
+            return {name: group[name][lo : max(lo, hi)] for name in columns}
+
+    def restore(
+        self,
+        db: ValueAveragingDatabase,
+        assets: Optional[Sequence[str]] = None,
+        batch: int = 10000,
+    ) -> Dict[str, int]:
+        """
+        Import records into the va_ tables, keeping their ids. Only records
+        past a table's highest id are inserted, so restoring again is a no-op.
+
+        :param assets: Assets to import. Default is every group.
+        :return: Rows inserted per asset.
+        """
+        assets = self.assets() if assets is None else assets
+        inserted = {}
+        with h5py.File(self.path, "r") as f:
+            for asset in assets:
+                group = f.get(asset.upper())
+                if group is None:
+                    logging.warning(f"No ledger for {asset} in {self.path}")
+                    continue
+                model = db.get_model(asset)
+                last = model.select(model.id).order_by(model.id.desc()).scalar() or 0
+
+                rows = int(group.attrs["rows"])
+                new = group["id"][:rows] > last
+                count = 0
+                with BufferedWriter(db.db, batch, keep_ids=True) as writer:
+                    first = int(np.argmax(new)) if new.any() else rows
+                    for offset in range(first, rows, batch):
+                        window = slice(offset, min(offset + batch, rows))
+                        keep = new[window]
+                        values = {
+                            name: group[name][window][keep].tolist()
+                            for name in COLUMN_TYPES
+                        }
+                        values["exchange"] = [
+                            name.decode() for name in values["exchange"]
+                        ]
+                        values["date"] = [
+                            datetime.fromtimestamp(stamp, timezone.utc)
+                            for stamp in values["date"]
+                        ]
+                        writer.extend(
+                            model,
+                            (dict(zip(values, row)) for row in zip(*values.values())),
+                        )
+                        count += int(keep.sum())
+                inserted[asset] = count
+                logging.info(f"Imported {count} records of {asset} from {self.path}")
+        return inserted
+
+    def _group(
+        self, f: h5py.File, asset_name: str, db: ValueAveragingDatabase
+    ) -> h5py.Group:
+        group = f.get(asset_name.upper())
+        if group is not None:
+            return group
+
+        group = f.create_group(asset_name.upper())
+        group.attrs["table"] = db.get_model(asset_name)._meta.table_name
+        group.attrs["rows"] = 0
+        group.attrs["last_id"] = 0
+        group.attrs["sorted"] = True
+        for name in COLUMN_TYPES:
+            group.create_dataset(
+                name,
+                shape=(0,),
+                maxshape=(None,),
+                dtype=_dtype(name),
+                chunks=(self.chunk,),
+                compression=self.compression,
+                compression_opts=self.level if self.compression == "gzip" else None,
+                shuffle=True,
+            )
+        return group
+
+    def _append(self, group: h5py.Group, columns: Dict[str, np.ndarray]) -> int:
+        rows = int(group.attrs["rows"])
+        size = len(columns["id"])
+        # A later id may carry an earlier date; load then can't bisect
+        dates = columns["date"]
+        ordered = bool(group.attrs.get("sorted", True)) and (
+            bool(np.all(dates[1:] >= dates[:-1]))
+            and (not rows or not size or int(group["date"][rows - 1]) <= dates[0])
+        )
+        for name, values in columns.items():
+            if name == "exchange":
+                values = values.astype(EXCHANGE_TYPE)
+            dataset = group[name]
+            dataset.resize((rows + size,))
+            dataset[rows:] = values
+        # Committed only once every column holds the new rows
+        group.attrs["rows"] = rows + size
+        group.attrs["sorted"] = ordered
+        group.attrs["last_id"] = max(
+            int(group.attrs["last_id"]), int(columns["id"].max())
+        )
+        return size
+
+
+@click.command()
+@click.argument("action", type=click.Choice(["export", "import"]))
+@click.option(
+    "--database",
+    default=None,
+    help="The name of the database. Default is value_averaging.sqlite.",
+)
+@click.option("--path", default="ledger.h5", help="HDF5 file. Default is ledger.h5.")
+@click.option(
+    "--assets",
+    default=None,
+    help="Comma separated asset names, e.g. BTC,ETH. Default is every asset.",
+)
+def main(action, database, path, assets):
+    db = ValueAveragingDatabase(database)
+    db.connect()
+    store = LedgerStore(path)
+    assets = assets.split(",") if assets else None
+    if action == "export":
+        counts = store.export(db, assets)
+    else:
+        counts = store.restore(db, assets)
+    logging.info(f"{action.title()}ed {sum(counts.values())} records: {counts}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
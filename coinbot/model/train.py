@@ -40,14 +40,12 @@ from coinbot.model.dense import Trainer
 def main(input_id, output_id, database, layers, parameters):
     # Load Simulated Data for Preprocessing
 
-    # Connect to database and get model
-    db = ValueAveragingDatabase(database)
+    # Connect read-only so training never blocks a running trader
+    db = ValueAveragingDatabase(database).replica()
     db.connect()
-    asset_model = db.get_model(input_id)
 
-    # Query data and convert to DataFrame
-    data = list(asset_model.select().dicts())
-    df = pd.DataFrame(data)
+    # Query data straight into a DataFrame
+    df = db.frame(input_id)
 
     # Data Preprocessing
 
@@ -0,0 +1,308 @@
+"""
+coinbot/montecarlo.py
+
+Monte Carlo stress testing for Value Averaging.
+
+Synthetic price paths are generated as a (paths, steps) array by one of:
+
+- gbm: geometric Brownian motion with constant drift and volatility
+- bootstrap: resampled blocks of historical log returns
+- regime_switching: GBM whose drift and volatility follow a Markov chain
+
+value_average_paths then runs Value Averaging over every path at once. It
+steps through time and vectorizes across paths, using the targets of
+ValueAveraging.get_target_amount and rounding every amount to cents and
+satoshis in float64. It is meant for distributions; use value_average_batch
+when each record must match the persisted series to the unit.
+"""
+
+import json
+from decimal import Decimal
+from typing import Dict, Optional, Sequence
+
+import click
+import numpy as np
+
+from coinbot import logging
+from coinbot.strategy.schedule import TargetSchedule
+
+
+def gbm(
+    s0: float,
+    mu: float,
+    sigma: float,
+    steps: int,
+    paths: int,
+    dt: float = 1 / 365,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Geometric Brownian motion paths starting at s0.
+
+    :param mu: Annual drift.
+    :param sigma: Annual volatility.
+    :param dt: Years per step; defaults to daily.
+    :return: float64 prices of shape (paths, steps), rounded to cents.
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((paths, steps))
+    returns = (mu - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * shocks
+    return _prices(s0, returns)
+
+
+def bootstrap(
+    history: Sequence[float],
+    steps: int,
+    paths: int,
+    block: int = 1,
+    s0: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Paths built from blocks of consecutive historical log returns.
+
+    :param history: Historical prices, oldest first.
+    :param block: Returns per block; longer blocks keep more autocorrelation.
+    :param s0: Starting price; defaults to the last historical price.
+    :return: float64 prices of shape (paths, steps), rounded to cents.
+    """
+    history = np.asarray(history, dtype=np.float64)
+    returns = np.diff(np.log(history))
+    if len(returns) < block:
+        raise ValueError("History must hold more prices than the block length.")
+
+    rng = np.random.default_rng(seed)
+    blocks = -(-steps // block)
+    starts = rng.integers(0, len(returns) - block + 1, size=(paths, blocks))
+    index = (starts[:, :, None] + np.arange(block)).reshape(paths, -1)[:, :steps]
+    return _prices(history[-1] if s0 is None else s0, returns[index])
+
+
+def regime_switching(
+    s0: float,
+    mu: Sequence[float] = (0.3, -0.5),
+    sigma: Sequence[float] = (0.5, 0.9),
+    transition: Sequence[Sequence[float]] = ((0.99, 0.01), (0.02, 0.98)),
+    steps: int = 365,
+    paths: int = 1000,
+    dt: float = 1 / 365,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    GBM paths whose drift and volatility switch between regimes.
+
+    :param mu: Annual drift per regime.
+    :param sigma: Annual volatility per regime.
+    :param transition: Per-step probabilities of moving from regime i
+        (row) to regime j (column).
+    :return: float64 prices of shape (paths, steps), rounded to cents.
+    """
+    mu, sigma = np.asarray(mu), np.asarray(sigma)
+    cumulative = np.cumsum(np.asarray(transition, dtype=np.float64), axis=1)
+    rng = np.random.default_rng(seed)
+
+    regime = np.zeros(paths, dtype=np.int64)
+    regimes = np.empty((paths, steps), dtype=np.int64)
+    draws = rng.random((paths, steps))
+    for t in range(steps):
+        regimes[:, t] = regime
+        regime = (draws[:, t, None] > cumulative[regime]).sum(axis=1)
+        regime = np.minimum(regime, len(mu) - 1)
+
+    shocks = rng.standard_normal((paths, steps))
+    m, s = mu[regimes], sigma[regimes]
+    returns = (m - 0.5 * s**2) * dt + s * np.sqrt(dt) * shocks
+    return _prices(s0, returns)
+
+
+def _prices(s0: float, returns: np.ndarray) -> np.ndarray:
+    # The first step is s0 itself; clamp to a cent so orders stay finite
+    levels = np.zeros_like(returns)
+    levels[:, 1:] = np.cumsum(returns[:, 1:], axis=1)
+    return np.maximum(np.round(s0 * np.exp(levels), 2), 0.01)
+
+
+def targets(
+    principal_amount: Decimal, interest_rate: Decimal, frequency: int, steps: int
+) -> np.ndarray:
+    """
+    The current target of intervals 1..steps, as used by the first record
+    and get_target_amount.
+    """
+    schedule = TargetSchedule.shared(principal_amount, interest_rate, frequency)
+    curve = np.array([float(target) for target in schedule.targets(1, steps + 1)])
+    if steps:
+        curve[0] = float(principal_amount)  # the first record buys the principal
+    return curve
+
+
+def value_average_paths(
+    prices: np.ndarray,
+    principal_amount: float,
+    interest_rate: float,
+    frequency: int,
+    places: tuple[int, int, int] = (2, 2, 8),
+) -> Dict[str, np.ndarray]:
+    """
+    Run Value Averaging over every path, starting at interval 1.
+
+    :param prices: float64 prices of shape (paths, steps).
+    :return: Per-path float64 arrays: 'final_value' (holdings at the last
+        price), 'total_invested' (net quote spent), 'capital_required' (peak
+        net quote spent), 'max_drawdown' (largest fall of profit, in quote)
+        and 'trade_count' (intervals with a non-zero order).
+    """
+    price_places, quote_places, base_places = places
+    prices = np.round(np.asarray(prices, dtype=np.float64), price_places)
+    paths, steps = prices.shape
+    schedule = targets(
+        Decimal(str(principal_amount)).quantize(Decimal("0.01")),
+        Decimal(str(interest_rate)).quantize(Decimal("0.01")),
+        frequency,
+        steps,
+    )
+
+    total_order = np.zeros(paths)
+    invested = np.zeros(paths)
+    capital = np.zeros(paths)
+    peak = np.full(paths, -np.inf)
+    drawdown = np.zeros(paths)
+    trades = np.zeros(paths, dtype=np.int64)
+    for t in range(steps):
+        price = prices[:, t]
+        if t == 0:
+            trade = np.full(paths, schedule[0])
+            order = np.round(trade / price, base_places)
+        else:
+            trade = schedule[t] - price * total_order
+            order = np.round(trade / price, base_places)
+            trade = np.round(trade, quote_places)
+        total_order = np.round(total_order + order, base_places)
+        invested = np.round(invested + trade, quote_places)
+        trades += order != 0
+
+        profit = total_order * price - invested
+        np.maximum(peak, profit, out=peak)
+        np.maximum(drawdown, peak - profit, out=drawdown)
+        np.maximum(capital, invested, out=capital)
+
+    return {
+        "final_value": total_order * prices[:, -1],
+        "total_invested": invested,
+        "capital_required": capital,
+        "max_drawdown": drawdown,
+        "trade_count": trades,
+    }
+
+
+def summarize(
+    results: Dict[str, np.ndarray], percentiles: Sequence[float] = (5, 25, 50, 75, 95)
+) -> Dict[str, dict]:
+    """
+    Mean, standard deviation and percentiles of every result.
+    """
+    summary = {}
+    for name, values in results.items():
+        values = np.asarray(values, dtype=np.float64)
+        summary[name] = {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            **{
+                f"p{p:g}": float(v)
+                for p, v in zip(percentiles, np.percentile(values, percentiles))
+            },
+        }
+    return summary
+
+
+@click.command()
+@click.option(
+    "--model",
+    type=click.Choice(["gbm", "bootstrap", "regime"]),
+    default="gbm",
+    help="Path generator. Default is gbm.",
+)
+@click.option("--paths", default=10000, help="Number of paths. Default is 10000.")
+@click.option("--steps", default=365, help="Intervals per path. Default is 365.")
+@click.option("--s0", default=100.0, help="Starting price. Default is 100.")
+@click.option("--mu", default=0.1, help="Annual drift for gbm. Default is 0.1.")
+@click.option("--sigma", default=0.6, help="Annual volatility for gbm. Default is 0.6.")
+@click.option(
+    "--asset",
+    default="BTC-USD",
+    help="Product whose stored candles feed bootstrap. Default is BTC-USD.",
+)
+@click.option("--start", default=None, help="History start for bootstrap.")
+@click.option("--end", default=None, help="History end for bootstrap.")
+@click.option(
+    "--granularity",
+    default="ONE_DAY",
+    help="Candle granularity for bootstrap. Default is ONE_DAY.",
+)
+@click.option(
+    "--store",
+    default="candles",
+    help="Candle store directory. Default is candles.",
+)
+@click.option("--block", default=5, help="Bootstrap block length. Default is 5.")
+@click.option(
+    "--principal",
+    default=10.00,
+    help="The principal amount. Default is 10.",
+)
+@click.option(
+    "--rate",
+    default=0.10,
+    help="The annual interest rate. Default is 0.10.",
+)
+@click.option(
+    "--frequency",
+    default=365,
+    help="How often interest is compounded per year. Default is 365.",
+)
+@click.option("--seed", default=None, type=click.INT, help="Generator seed.")
+@click.option(
+    "--output",
+    default="montecarlo.json",
+    help="Summary JSON path. Default is montecarlo.json.",
+)
+def main(
+    model,
+    paths,
+    steps,
+    s0,
+    mu,
+    sigma,
+    asset,
+    start,
+    end,
+    granularity,
+    store,
+    block,
+    principal,
+    rate,
+    frequency,
+    seed,
+    output,
+):
+    if model == "gbm":
+        prices = gbm(s0, mu, sigma, steps, paths, seed=seed)
+    elif model == "regime":
+        prices = regime_switching(s0, steps=steps, paths=paths, seed=seed)
+    else:
+        from coinbot.store import CandleStore
+
+        history = CandleStore(root=store).load(asset, granularity, start, end)
+        if len(history["close"]) <= block:
+            logging.warning(f"Not enough stored candles for {asset}")
+            return
+        prices = bootstrap(history["close"], steps, paths, block, seed=seed)
+
+    results = value_average_paths(prices, principal, rate, frequency)
+    with open(output, "w") as f:
+        json.dump(summarize(results), f, indent=2)
+    logging.info(f"Wrote the summary of {paths} paths to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+coinbot/portfolio.py
+
+Multi-asset portfolio simulation on a shared clock.
+
+Every asset runs its own Strategy. The clock is the union of the assets'
+candle timestamps; an asset without a bar at a tick does not trade and is
+valued at its last close. Report columns are aligned to the clock:
+
+- value: holdings of every asset at its last close
+- cash_flow: net quote spent at the tick (buys minus sells)
+- invested: cumulative cash_flow
+- profit: value minus invested
+"""
+
+import contextlib
+import csv
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+import click
+import numpy as np
+
+from coinbot import logging
+from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy.base import Strategy
+
+
+def align(
+    series: Dict[str, Dict[str, np.ndarray]], key: str = "close"
+) -> tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Put per-asset candles on one clock.
+
+    :param series: Candle columns per asset, as returned by CandleStore.load.
+    :param key: Column used as the price.
+    :return: (clock, prices) where clock holds the sorted union of 'start'
+        timestamps and prices maps each asset to a float64 array aligned to
+        the clock, NaN where the asset has no bar.
+    """
+    starts = [np.asarray(columns["start"]) for columns in series.values()]
+    clock = np.unique(np.concatenate(starts)) if starts else np.empty(0, np.int64)
+    prices = {}
+    for asset, columns in series.items():
+        aligned = np.full(len(clock), np.nan)
+        aligned[np.searchsorted(clock, columns["start"])] = columns[key]
+        prices[asset] = aligned
+    return clock, prices
+
+
+def _forward_fill(values: np.ndarray, valid: np.ndarray, initial) -> np.ndarray:
+    # Carry the last valid value over gaps; `initial` before the first one
+    index = np.where(valid, np.arange(len(values)), -1)
+    np.maximum.accumulate(index, out=index)
+    filled = np.where(index >= 0, values[np.maximum(index, 0)], initial)
+    return filled
+
+
+class Portfolio:
+    def __init__(
+        self,
+        strategies: Dict[str, Strategy],
+        db: Optional[ValueAveragingDatabase] = None,
+    ):
+        """
+        :param strategies: Strategy per asset, keyed like the price arrays.
+        :param db: Database shared by the strategies' records; each tick is
+            written in one transaction, or buffered by the database's writer
+            for strategies created with bulk=True.
+        """
+        if not strategies:
+            raise ValueError("Must provide at least one strategy.")
+        self.strategies = strategies
+        self.db = db
+
+    def tick(self, timestamp: datetime, prices: Dict[str, float]) -> Dict[str, dict]:
+        """
+        Advance every asset that has a price at this tick.
+
+        :param prices: Price per asset; None or NaN marks a missing bar.
+        :return: The records produced, keyed by asset.
+        """
+        transaction = (
+            self.db.db.atomic() if self.db is not None else contextlib.nullcontext()
+        )
+        records = {}
+        with transaction:
+            for asset, price in prices.items():
+                if price is None or price != price:
+                    continue
+                record = self.strategies[asset].update(price, timestamp)
+                if record is not None:
+                    records[asset] = record
+        return records
+
+    def run(
+        self,
+        clock: Sequence[int],
+        prices: Dict[str, np.ndarray],
+        persist: bool = False,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Drive every strategy over the clock.
+
+        Without persistence each asset runs through its batch path on its own
+        bars. With persistence the clock is replayed tick by tick so every
+        tick's records are saved together.
+
+        :param clock: UNIX timestamps of the ticks.
+        :param prices: float64 prices aligned to the clock, NaN for missing bars.
+        :param persist: Save records through the strategies' record hook.
+        :return: Report columns as described in the module docstring plus 'date'.
+        """
+        clock = np.asarray(clock)
+        holdings, trades = {}, {}
+        initial = {
+            asset: strategy.total_order_units
+            for asset, strategy in self.strategies.items()
+        }
+
+        if persist:
+            for asset in self.strategies:
+                holdings[asset] = np.zeros(len(clock), dtype=np.int64)
+                trades[asset] = np.zeros(len(clock), dtype=np.int64)
+            for i, timestamp in enumerate(clock.tolist()):
+                when = datetime.fromtimestamp(timestamp, timezone.utc)
+                tick = {asset: prices[asset][i] for asset in self.strategies}
+                records = self.tick(when, tick)
+                for asset, strategy in self.strategies.items():
+                    # Skipped ticks trade nothing and keep the holdings
+                    holdings[asset][i] = strategy.total_order_units
+                    if asset in records:
+                        trades[asset][i] = int(
+                            records[asset]["trade_amount"].scaleb(
+                                strategy.quote_precision
+                            )
+                        )
+        else:
+            for asset, strategy in self.strategies.items():
+                valid = ~np.isnan(prices[asset])
+                columns = strategy.update_batch(prices[asset][valid], clock[valid])
+                # Ticks at or before a resumed record are dropped; place the
+                # rows by date and keep the holdings over the skipped ticks
+                rows = np.searchsorted(clock, columns["date"])
+                recorded = np.zeros(len(clock), dtype=bool)
+                recorded[rows] = True
+                held = np.zeros(len(clock), dtype=np.int64)
+                held[rows] = columns["total_order_size"]
+                holdings[asset] = _forward_fill(held, recorded, initial[asset])
+                trades[asset] = np.zeros(len(clock), dtype=np.int64)
+                trades[asset][rows] = columns["trade_amount"]
+
+        return self._report(clock, prices, holdings, trades, initial)
+
+    def _report(
+        self, clock, prices, holdings, trades, initial
+    ) -> Dict[str, np.ndarray]:
+        value = np.zeros(len(clock))
+        cash_flow = np.zeros(len(clock))
+        for asset, strategy in self.strategies.items():
+            valid = ~np.isnan(prices[asset])
+            price = _forward_fill(prices[asset], valid, 0.0)
+            held = _forward_fill(holdings[asset], valid, initial[asset])
+            value += held / 10.0**strategy.base_precision * price
+            cash_flow += trades[asset] / 10.0**strategy.quote_precision
+
+        invested = np.cumsum(cash_flow)
+        return {
+            "date": clock,
+            "value": value,
+            "cash_flow": cash_flow,
+            "invested": invested,
+            "profit": value - invested,
+        }
+
+
+def write_report(report: Dict[str, np.ndarray], path: str) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(report))
+        writer.writerows(zip(*(column.tolist() for column in report.values())))
+
+
+@click.command()
+@click.option(
+    "--assets",
+    default="BTC-USD,ETH-USD",
+    help="Comma separated product IDs read from the candle store. Default is BTC-USD,ETH-USD.",
+)
+@click.option("--start", required=True, help="Start date. Format: ISO 8601.")
+@click.option("--end", required=True, help="End date. Format: ISO 8601.")
+@click.option(
+    "--granularity",
+    default="ONE_DAY",
+    help="Candle granularity. Default is ONE_DAY.",
+)
+@click.option(
+    "--store",
+    default="candles",
+    help="Candle store directory. Default is candles.",
+)
+@click.option(
+    "--principal",
+    default=10.00,
+    help="The principal amount per asset. Default is 10.",
+)
+@click.option(
+    "--rate",
+    default=0.10,
+    help="The annual interest rate. Default is 0.10.",
+)
+@click.option(
+    "--frequency",
+    default=365,
+    help="How often interest is compounded per year. Default is 365.",
+)
+@click.option(
+    "--persist/--no-persist",
+    default=False,
+    help="Save every record to the database. Default is --no-persist.",
+)
+@click.option(
+    "--output",
+    default="portfolio.csv",
+    help="Report CSV path. Default is portfolio.csv.",
+)
+def main(
+    assets, start, end, granularity, store, principal, rate, frequency, persist, output
+):
+    from coinbot.store import CandleStore
+    from coinbot.strategy.value_average import ValueAveraging
+
+    candles = CandleStore(root=store)
+    series = {}
+    for asset in assets.split(","):
+        columns = candles.load(asset, granularity, start, end)
+        if not len(columns["start"]):
+            logging.warning(f"No stored candles for {asset}; run the store first")
+            continue
+        series[asset] = columns
+    if not series:
+        return
+
+    # Only a persisted run opens the database and creates its tables
+    db = ValueAveragingDatabase() if persist else None
+    strategies = {
+        asset: ValueAveraging(
+            asset_name=asset.split("-")[0],
+            principal_amount=principal,
+            interest_rate=rate,
+            frequency=frequency,
+            resume=persist,
+            db=db,
+            bulk=True,
+            persist=persist,
+        )
+        for asset in series
+    }
+    clock, prices = align(series)
+    report = Portfolio(strategies, db).run(clock, prices, persist)
+    write_report(report, output)
+    logging.info(f"Wrote {len(clock)} ticks for {len(series)} assets to {output}")
+    if db is not None:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,235 @@
 """
-coinbot/sample.py
+coinbot/simulate.py
+
+Paper trade Value Averaging over historical candles.
+
+The simulation is a pipeline of generators, so memory stays flat no matter
+how long the date range is:
+
+    source -> prefetch -> normalize -> strategize -> sink
+
+- source: chunks of candle columns from the REST API, the local candle
+  store or a CSV file
+- prefetch: runs the source on a worker thread, at most `depth` chunks
+  ahead, so fetching overlaps with computing
+- normalize: sorted, de-duplicated (start, close) arrays
+- strategize: the strategy's batch path, carrying its state across chunks
+- sink: saves records through the database's buffered writer, in
+  transactions of `batch` rows
 """
+
+import csv
+import os
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List
+from typing import Dict, Iterable, Iterator, Optional, Union
 
 import click
+import numpy as np
 
 from coinbot import logging
-from coinbot.strategy.value_average import ValueAveraging
+from coinbot.coinbase import candles as ohlc
+from coinbot.coinbase.transport import read_ahead
+from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy.base import Strategy
+from coinbot.strategy.fixed_point import to_decimal
+
+Chunk = Dict[str, np.ndarray]
+
+
+def rest_source(
+    product,
+    product_id: str,
+    start: ohlc.Timestamp,
+    end: ohlc.Timestamp,
+    granularity: Union[int, str] = "ONE_MINUTE",
+) -> Iterator[Chunk]:
+    """
+    Candles from Product.candles, one request window per chunk.
+    """
+    name = ohlc.to_name(granularity)
+    lo, hi = ohlc.to_unix(start), ohlc.to_unix(end)
+    for window in ohlc.windows(start, end, granularity):
+        params = {"start": str(window[0]), "end": str(window[1]), "granularity": name}
+        chunk = ohlc.columns([product.candles(product_id, params)])
+        mask = (chunk["start"] >= lo) & (chunk["start"] < hi)
+        yield {key: value[mask] for key, value in chunk.items()}
+
+
+def store_source(
+    store,
+    product_id: str,
+    start: ohlc.Timestamp,
+    end: ohlc.Timestamp,
+    granularity: Union[int, str] = "ONE_MINUTE",
+    chunk: int = 10000,
+) -> Iterator[Chunk]:
+    """
+    Candles from a CandleStore, sliced from its memory maps without copying.
+    """
+    columns = store.load(product_id, granularity, start, end)
+    for lo in range(0, len(columns["start"]), chunk):
+        yield {key: value[lo : lo + chunk] for key, value in columns.items()}
+
+
+def csv_source(path: str, chunk: int = 10000) -> Iterator[Chunk]:
+    """
+    Candles from a CSV file with a header row, read `chunk` rows at a time.
+
+    The time column is 'start', 'time' or 'date' as UNIX seconds or ISO 8601;
+    the price column is 'close'.
+    """
+    with open(path, "r", newline="") as f:
+        reader = csv.DictReader(f)
+        key = next(
+            (name for name in ("start", "time", "date") if name in reader.fieldnames),
+            None,
+        )
+        if key is None or "close" not in reader.fieldnames:
+            raise ValueError(f"{path} needs a start, time or date and a close column")
+
+        starts, closes = [], []
+        for row in reader:
+            value = row[key]
+            starts.append(int(value) if value.isdigit() else ohlc.to_unix(value))
+            closes.append(float(row["close"]))
+            if len(starts) == chunk:
+                yield {"start": np.array(starts, np.int64), "close": np.array(closes)}
+                starts, closes = [], []
+        if starts:
+            yield {"start": np.array(starts, np.int64), "close": np.array(closes)}
+
+
+def prefetch(chunks: Iterable[Chunk], depth: int = 2) -> Iterator[Chunk]:
+    """
+    Produce chunks on a worker thread, at most `depth` ahead of the consumer.
+    """
+    return read_ahead(chunks, depth, name="prefetch")
+
+
+def normalize(chunks: Iterable[Chunk], after: Optional[int] = None) -> Iterator[Chunk]:
+    """
+    Sort each chunk, drop invalid prices and candles at or before the last
+    one already passed on.
+
+    :param after: Also drop candles at or before this UNIX time, e.g. the
+        date of a resumed strategy's last record.
+    """
+    last = after
+    for chunk in chunks:
+        start = np.asarray(chunk["start"], dtype=np.int64)
+        close = np.asarray(chunk["close"], dtype=np.float64)
+        start, index = np.unique(start, return_index=True)
+        close = close[index]
+        keep = np.isfinite(close) & (close > 0)
+        if last is not None:
+            keep &= start > last
+        if keep.any():
+            start, close = start[keep], close[keep]
+            last = int(start[-1])
+            yield {"start": start, "close": close}
+
+
+def strategize(chunks: Iterable[Chunk], strategy: Strategy) -> Iterator[Chunk]:
+    """
+    Run the strategy's batch path over every chunk; the state carries over.
+    """
+    for chunk in chunks:
+        yield strategy.update_batch(chunk["close"], chunk["start"])
+
+
+def sink(
+    chunks: Iterable[Chunk],
+    strategy: Strategy,
+    batch: int = 5000,
+    persist: bool = True,
+) -> int:
+    """
+    Save every record through the database's buffered writer, `batch` rows
+    per transaction.
+
+    :param persist: False drains the pipeline without writing.
+    :return: Number of records consumed.
+    """
+    scales = strategy.scales(strategy.places(2))
+    model = strategy.model if persist else None
+    if model is not None:
+        writer = strategy.db.writer(batch)
+        names = ("exchange", "date", "interval", *strategy.columns)
+
+    count = 0
+    for columns in chunks:
+        size = len(columns["date"])
+        count += size
+        if model is None:
+            continue
+        for lo in range(0, size, batch):
+            window = slice(lo, lo + batch)
+            rows = zip(
+                ["paper"] * len(columns["date"][window]),
+                [
+                    datetime.fromtimestamp(stamp, timezone.utc)
+                    for stamp in columns["date"][window].tolist()
+                ],
+                columns["interval"][window].tolist(),
+                *(
+                    [
+                        to_decimal(units, scales[key])
+                        for units in columns[key][window].tolist()
+                    ]
+                    for key in strategy.columns
+                ),
+            )
+            writer.extend(model, (dict(zip(names, row)) for row in rows))
+    if model is not None:
+        writer.flush()
+    return count
+
+
+def _product():
+    from dotenv import load_dotenv
+
+    from coinbot.coinbase.advanced import Product
+    from coinbot.coinbase.client import API, Auth, Client
+
+    load_dotenv(".env")
+    api = API(
+        settings={
+            "key": os.getenv("COINBASE_API_KEY"),
+            "secret": os.getenv("COINBASE_API_SECRET"),
+            "version": 3,
+        }
+    )
+    return Product(Client(api, Auth(api)))
 
 
 @click.command()
 @click.option(
-    "--symbols", default="BTC/USD", help="Crypto symbols to sample. Default is BTC/USD."
+    "--source",
+    type=click.Choice(["rest", "store", "csv"]),
+    default="store",
+    help="Where candles are read from. Default is store.",
 )
 @click.option(
-    "--timeframe",
-    default="1D",
-    help="Timeframe for sampling. Default is 1D. Possible values: '1D', '1H', '15T', etc.",
+    "--product", default="BTC-USD", help="Product to simulate. Default is BTC-USD."
 )
 @click.option(
-    "--start",
-    default=None,
-    help="Start date-time for sampling. Format: RFC-3339 or YYYY-MM-DD.",
+    "--granularity",
+    default="ONE_DAY",
+    help="Candle granularity. Default is ONE_DAY. Possible values: ONE_MINUTE, ONE_HOUR, etc.",
 )
+@click.option("--start", default=None, help="Start date-time. Format: ISO 8601.")
+@click.option("--end", default=None, help="End date-time. Format: ISO 8601.")
 @click.option(
-    "--end",
-    default=None,
-    help="End date-time for sampling. Format: RFC-3339 or YYYY-MM-DD.",
+    "--store",
+    default="candles",
+    help="Candle store directory. Default is candles.",
 )
+@click.option("--path", default=None, help="CSV file for the csv source.")
 @click.option(
-    "--loc",
-    default="us",
-    help="The location for sampling. Default is us. Possible values: 'us', etc.",
+    "--strategy",
+    type=click.Choice(["va", "ca", "dca"]),
+    default="va",
+    help="Value, cost or dynamic cost averaging. Default is va.",
 )
 @click.option(
     "--principal",
@@ -50,158 +247,111 @@ from coinbot.strategy.value_average import ValueAveraging
     help="How often interest is compounded per year. Default is 365. Specify as an integer value.",
 )
 @click.option(
-    "--interval",
+    "--min-multiplier",
     default=1,
-    help="The time step between each trade. Default is 1. Specify as an integer value.",
+    help="Smallest dynamic cost averaging multiplier. Default is 1.",
 )
-def main(symbols, timeframe, start, end, loc, principal, rate, frequency, interval):
-    if "," in symbols or "/" not in symbols:
-        logging.error(
-            "Please provide a single asset class in the format 'ASSET/CURRENCY'"
-        )
+@click.option(
+    "--max-multiplier",
+    default=5,
+    help="Largest dynamic cost averaging multiplier. Default is 5.",
+)
+@click.option("--chunk", default=10000, help="Candles per chunk. Default is 10000.")
+@click.option("--batch", default=5000, help="Records per transaction. Default is 5000.")
+@click.option("--depth", default=2, help="Chunks fetched ahead. Default is 2.")
+@click.option(
+    "--persist/--no-persist",
+    default=True,
+    help="Save records to the database. Default is --persist.",
+)
+def main(
+    source,
+    product,
+    granularity,
+    start,
+    end,
+    store,
+    path,
+    strategy,
+    principal,
+    rate,
+    frequency,
+    min_multiplier,
+    max_multiplier,
+    chunk,
+    batch,
+    depth,
+    persist,
+):
+    if source == "csv" and path is None:
+        logging.error("The csv source requires --path")
         return
 
-    if start is None:
-        dt_start = datetime.now(timezone.utc) - timedelta(days=1)
-    else:
-        dt_start = datetime.fromisoformat(start).replace(tzinfo=timezone.utc)
+    asset_name = product.split("-")[0]
+    db = ValueAveragingDatabase()
+    if strategy == "va":
+        from coinbot.strategy.value_average import ValueAveraging
 
-    if end is None:
-        dt_end = datetime.now(timezone.utc)
-    else:
-        dt_end = datetime.fromisoformat(end).replace(tzinfo=timezone.utc)
-
-    params = {
-        "symbols": symbols,
-        "timeframe": timeframe,
-        "start": dt_start.isoformat(),
-        "end": dt_end.isoformat(),
-    }
+        averager = ValueAveraging(
+            asset_name, principal, rate, frequency, db=db, resume=persist, bulk=True
+        )
+        logging.info(
+            f"Initialized ValueAveraging with {averager.principal_amount} principal at {averager.interest_rate} APY."
+        )
+    elif strategy == "ca":
+        from coinbot.strategy.cost_average import CostAveraging
 
-    sampled = alpaca.page_crypto_candlesticks(loc, params)
+        averager = CostAveraging(
+            asset_name, principal, db=db, resume=persist, bulk=True
+        )
+        logging.info(
+            f"Initialized CostAveraging with {averager.principal_amount} principal."
+        )
+    else:
+        from coinbot.strategy.dynamic_cost_average import DynamicCostAveraging
 
-    if not sampled:
-        logging.warning(f"No results for {symbols} from {start} to {end}")
-        return
+        averager = DynamicCostAveraging(
+            asset_name,
+            principal,
+            min_multiplier,
+            max_multiplier,
+            db=db,
+            resume=persist,
+            bulk=True,
+        )
+        logging.info(
+            f"Initialized DynamicCostAveraging with {averager.principal_amount} principal "
+            f"and multipliers {min_multiplier} to {max_multiplier}."
+        )
 
-    asset_name = symbols.split("/")[0]
-    va = ValueAveraging(
-        asset_name=asset_name,
-        principal_amount=principal,
-        interest_rate=rate,
-        frequency=frequency,  # Using daily candlesticks
-        interval=interval,  # Starting interval
-    )
-    logging.info(
-        f"Initialized ValueAveraging with {va.principal_amount} principal at {va.interest_rate} APY."
-    )
+    now = datetime.now(timezone.utc)
+    start = start or (now - timedelta(days=365)).isoformat()
+    end = end or now.isoformat()
+    after = None
+    if averager.last_timestamp is not None:
+        # Continue after the resumed record instead of replaying the range
+        after = int(averager.last_timestamp)
+        start = max(ohlc.to_unix(start), after + 1)
+        logging.info(f"Resuming {product} after {averager.last_timestamp}.")
 
-    # key: str = "BTC/USD"
-    # results: List[Dict[str, str | int | float]] = [
-    #     {
-    #       "t": "2022-05-27T10:18:00Z",
-    #       "o": 28999,
-    #       "h": 29003,
-    #       "l": 28999,
-    #       "c": 29003,
-    #       "v": 0.01,
-    #       "n": 4,
-    #       "vw": 29001
-    #     }
-    # ]
-    #
-    # Flag to check if the first record is initialized
-    is_first_record_initialized = False
-
-    for key, results in sampled.items():
-        # Initialize if first record
-        if not is_first_record_initialized:
-            first_market_price = results[0]["c"]
-            va.initialize_first_record(
-                market_price=first_market_price, datetime=results[0]["t"]
-            )
-            is_first_record_initialized = True
-            start_index = 1  # Skip the first record in the subsequent loop
-        else:
-            start_index = 0  # Include all records
+    if source == "rest":
+        chunks = rest_source(_product(), product, start, end, granularity)
+    elif source == "store":
+        from coinbot.store import CandleStore
 
-        # Process the sampled data
-        for i in range(start_index, len(results)):
-            result = results[i]
-            if "c" in result and "t" in result:
-                market_price = result["c"]
-                dt = result["t"]
-                va.update_records(market_price, dt)
-            else:
-                logging.warning("Skipping record due to missing 'c' or 't' fields.")
+        chunks = store_source(
+            CandleStore(root=store), product, start, end, granularity, chunk
+        )
+    else:
+        chunks = csv_source(path, chunk)
 
-    va.db.close()
+    chunks = normalize(prefetch(chunks, depth), after)
+    count = sink(strategize(chunks, averager), averager, batch, persist)
+    if not count:
+        logging.warning(f"No candles for {product} from {start} to {end}")
+    logging.info(f"Simulated {count} intervals; next interval is {averager.interval}.")
+    averager.db.close()
 
 
 if __name__ == "__main__":
     main()
-
-# Historical bars
-#
-# GET https://data.alpaca.markets/v1beta3/crypto/{loc}/bars
-# The crypto bars API provides historical aggregates for a list of crypto symbols between the specified dates.
-#
-# PATH PARAMS
-# loc string required
-# Crypto location, e.g. us
-#
-# QUERY PARAMS
-# symbols string required
-# Comma separated list of symbols, e.g. "BTC/USD,LTC/USD"
-#
-# timeframe string required
-# The timeframe of the bar aggregation. 5Min for example creates 5 minute aggregates, e.g. 1Min
-# You can use the following values:
-#
-# - [1-59]Min / T
-# - [1-23]Hour / H
-# - 1Day / D
-# - 1Week / W
-# - [1,2,3,4,6,12]Month / M
-#
-# start date-time
-# The inclusive start of the interval. Format: RFC-3339 or YYYY-MM-DD.
-# If missing, the default value is the beginning of the current day.
-#
-# end date-time
-# The inclusive end of the interval. Format: RFC-3339 or YYYY-MM-DD.
-# If missing, the default value is the current time.
-#
-# date-time usage example: 2022-01-04T01:02:03.123456789Z
-#
-# limit int64
-# Number of maximum data points to return in a response.
-# The limit applies to the total number of data points, not per symbol!
-# You can use the next_page_token to fetch the next at most limit responses.
-#
-# page_token string
-# Pagination token to continue from. The value to pass here is returned in specific requests when more data is available than the request limit allows.
-#
-# sort string
-# Sort data in ascending or descending order.
-#
-# Response
-# 200 ok
-#
-# {
-#   "bars": {
-#     "BTC/USD": [
-#       {
-#         "t": "2022-05-27T10:18:00Z",
-#         "o": 28999,
-#         "h": 29003,
-#         "l": 28999,
-#         "c": 29003,
-#         "v": 0.01,
-#         "n": 4,
-#         "vw": 29001
-#       }
-#     ]
-#   },
-#   "next_page_token": null
-# }
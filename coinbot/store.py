@@ -0,0 +1,235 @@
+"""
+coinbot/store.py
+
+A local, columnar candle store for Coinbase Advanced products.
+
+Candles are kept per (product_id, granularity) as one .npy file per column
+(start, low, high, open, close, volume) and read back memory-mapped, so
+slicing years of history never copies it. A small ranges.json records which
+half-open [start, end) spans have already been fetched; only the gaps are
+requested through Product.candles_range.
+
+Layout:
+
+    <root>/<product_id>/<granularity seconds>/
+        current
+        v<version>/
+            start.npy low.npy high.npy open.npy close.npy volume.npy
+            ranges.json
+
+Every write builds a new version directory and then replaces the current
+pointer file with a single rename, so a crash leaves either the old columns
+and ranges or the new ones, never a mix. The version it replaced is kept
+until the next write for readers still holding its memory maps.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from coinbot import logging
+from coinbot.coinbase.advanced import Product
+from coinbot.coinbase.candles import COLUMNS, Timestamp, empty, to_seconds, to_unix
+
+# Names the version directory holding the current columns
+CURRENT = "current"
+
+
+class CandleStore:
+    def __init__(self, product: Optional[Product] = None, root: str = "candles"):
+        """
+        :param product: Product subscriber used to fetch missing spans.
+            Without one the store is read-only.
+        :param root: Directory holding the store.
+        """
+        self.product = product
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def path(self, product_id: str, granularity: Union[int, str]) -> Path:
+        return self.root / product_id.upper() / str(to_seconds(granularity))
+
+    def ranges(self, product_id: str, granularity: Union[int, str]) -> list[list[int]]:
+        """
+        The merged, sorted [start, end) spans already present on disk.
+        """
+        version = self._version(self.path(product_id, granularity))
+        if version is None or not (version / "ranges.json").exists():
+            return []
+        with open(version / "ranges.json", "r") as f:
+            return json.load(f)
+
+    def missing(
+        self,
+        product_id: str,
+        granularity: Union[int, str],
+        start: Timestamp,
+        end: Timestamp,
+    ) -> list[tuple[int, int]]:
+        """
+        The [start, end) spans within the request that are not yet stored.
+        """
+        lo, hi = self._bounds(granularity, start, end)
+        gaps = []
+        for covered_lo, covered_hi in self.ranges(product_id, granularity):
+            if covered_hi <= lo or covered_lo >= hi:
+                continue
+            if covered_lo > lo:
+                gaps.append((lo, covered_lo))
+            lo = max(lo, covered_hi)
+        if lo < hi:
+            gaps.append((lo, hi))
+        return gaps
+
+    def load(
+        self,
+        product_id: str,
+        granularity: Union[int, str],
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Read stored candles without touching the network.
+
+        :return: Read-only, memory-mapped columns sliced to [start, end).
+        :raises ValueError: If the stored columns differ in length.
+        """
+        version = self._version(self.path(product_id, granularity))
+        if version is None:
+            return empty()
+
+        columns = {
+            key: np.load(version / f"{key}.npy", mmap_mode="r") for key in COLUMNS
+        }
+        lengths = {key: len(value) for key, value in columns.items()}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"Candle columns in {version} differ in length: {lengths}")
+        lo = 0 if start is None else np.searchsorted(columns["start"], to_unix(start))
+        hi = (
+            len(columns["start"])
+            if end is None
+            else np.searchsorted(columns["start"], to_unix(end))
+        )
+        return {key: value[lo:hi] for key, value in columns.items()}
+
+    def fill(
+        self,
+        product_id: str,
+        granularity: Union[int, str],
+        start: Timestamp,
+        end: Timestamp,
+    ) -> int:
+        """
+        Fetch and store every missing span between start and end.
+
+        :return: Number of new candles written.
+        """
+        gaps = self.missing(product_id, granularity, start, end)
+        if not gaps:
+            return 0
+        if self.product is None:
+            raise ValueError("A Product subscriber is required to fetch candles.")
+
+        fetched = [
+            self.product.candles_range(product_id, lo, hi, granularity)
+            for lo, hi in gaps
+        ]
+        with self._lock:
+            written = self._write(product_id, granularity, fetched, gaps)
+        logging.info(f"Stored {written} candles for {product_id} over {len(gaps)} gaps")
+        return written
+
+    def read(
+        self,
+        product_id: str,
+        granularity: Union[int, str],
+        start: Timestamp,
+        end: Timestamp,
+        fetch: bool = True,
+    ) -> dict[str, np.ndarray]:
+        """
+        Fill any gaps (unless fetch is False) and return the requested slice.
+        """
+        if fetch:
+            self.fill(product_id, granularity, start, end)
+        return self.load(product_id, granularity, start, end)
+
+    def _bounds(
+        self, granularity: Union[int, str], start: Timestamp, end: Timestamp
+    ) -> tuple[int, int]:
+        # Align to bucket edges and never treat the still-open bucket as final
+        step = to_seconds(granularity)
+        lo = to_unix(start) // step * step
+        hi = min(-(-to_unix(end) // step) * step, int(time.time()) // step * step)
+        return lo, max(lo, hi)
+
+    def _version(self, folder: Path) -> Optional[Path]:
+        # The directory holding the current columns, None if nothing is stored
+        pointer = folder / CURRENT
+        if pointer.exists():
+            return folder / pointer.read_text().strip()
+        # Stores written before versioning keep their columns in the folder
+        if (folder / "start.npy").exists():
+            return folder
+        return None
+
+    def _write(
+        self,
+        product_id: str,
+        granularity: Union[int, str],
+        fetched: list[dict[str, np.ndarray]],
+        gaps: list[tuple[int, int]],
+    ) -> int:
+        folder = self.path(product_id, granularity)
+        folder.mkdir(parents=True, exist_ok=True)
+
+        # Copy out of the memory maps so their version can be pruned later
+        stored = {
+            key: np.array(value)
+            for key, value in self.load(product_id, granularity).items()
+        }
+        merged = {
+            key: np.concatenate([stored[key]] + [part[key] for part in fetched])
+            for key in COLUMNS
+        }
+        starts, index = np.unique(merged["start"], return_index=True)
+        written = len(starts) - len(stored["start"])
+
+        spans = sorted(self.ranges(product_id, granularity) + [list(g) for g in gaps])
+        ranges = []
+        for lo, hi in spans:
+            if ranges and lo <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], hi)
+            else:
+                ranges.append([lo, hi])
+
+        version = Path(tempfile.mkdtemp(prefix="v", dir=folder))
+        for key in COLUMNS:
+            column = starts if key == "start" else merged[key][index]
+            np.save(version / f"{key}.npy", np.ascontiguousarray(column))
+        with open(version / "ranges.json", "w") as f:
+            json.dump(ranges, f)
+
+        previous = self._version(folder)
+        tmp = folder / f"{CURRENT}.{version.name}.tmp"
+        tmp.write_text(version.name)
+        os.replace(tmp, folder / CURRENT)
+        self._prune(folder, keep={version, previous})
+        return written
+
+    def _prune(self, folder: Path, keep: set) -> None:
+        # Best effort: a version still mapped elsewhere may refuse to go
+        for entry in folder.iterdir():
+            if entry.is_dir() and entry.name.startswith("v") and entry not in keep:
+                shutil.rmtree(entry, ignore_errors=True)
+        if folder not in keep:
+            for key in COLUMNS:
+                (folder / f"{key}.npy").unlink(missing_ok=True)
+            (folder / "ranges.json").unlink(missing_ok=True)
@@ -0,0 +1,315 @@
+"""
+coinbot/strategy/base.py
+
+The interface shared by the averaging strategies.
+
+Every strategy produces the same leading columns per interval: Market Price,
+Current Target, Current Value, Trade Amount, Total Trade Amount, Order Size
+and Total Order Size. Strategies may append their own columns after these.
+
+A strategy is advanced either one tick at a time with update, which also
+hands the record to the strategy's persistence hook, or over a whole price
+series with update_batch, which returns NumPy columns and persists nothing.
+Both paths compute in integer fixed-point units and produce identical values.
+
+A strategy attached to a database records every update in its own table,
+named by its table_prefix and the asset, e.g. va_btc, ca_btc or dca_btc.
+
+Ticks must move forward in time. Both paths skip, with a warning, any tick
+dated at or before the last record, so replaying overlapping data never
+appends duplicate intervals.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime as dt, timezone
+from decimal import Decimal
+from sqlite3 import IntegrityError, OperationalError
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from iso8601 import parse_date
+
+from coinbot import logging
+from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy.fixed_point import to_decimal, to_units
+
+COLUMNS = (
+    "market_price",
+    "current_target",
+    "current_value",
+    "trade_amount",
+    "total_trade_amount",
+    "order_size",
+    "total_order_size",
+)
+
+
+def batch_scales(places: tuple[int, int, int] = (2, 2, 8)) -> Dict[str, int]:
+    """
+    Decimal places of each column. Values are stored as scaled int64,
+    e.g. cents for quote amounts and satoshis for base amounts.
+
+    :param places: Decimal places of (price, quote, base) units.
+    """
+    price_places, quote_places, base_places = places
+    return {
+        "market_price": price_places,
+        "current_target": price_places,
+        "current_value": price_places,
+        "trade_amount": quote_places,
+        "total_trade_amount": quote_places,
+        "order_size": base_places,
+        "total_order_size": base_places,
+    }
+
+
+def timestamp(value) -> float:
+    """
+    UNIX seconds of a number, ISO 8601 string or datetime; naive is UTC.
+    """
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if isinstance(value, str):
+        value = parse_date(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class Strategy(ABC):
+    columns = COLUMNS
+    table_prefix = "va"
+
+    def __init__(
+        self,
+        asset_name: str,
+        principal_amount: float,
+        interval: Optional[int] = 1,
+        base_precision: Optional[int] = 8,
+        quote_precision: Optional[int] = 2,
+    ):
+        self.asset_name = asset_name
+        self.interval = interval
+        self.base_precision = base_precision  # e.g. satoshis
+        self.quote_precision = quote_precision  # e.g. cents
+        # Running totals in integer base/quote units
+        self.total_order_units = 0
+        self.total_trade_units = 0
+        # UNIX seconds of the last record; later ticks must be after it
+        self.last_timestamp: Optional[float] = None
+        self.principal_amount = self.round_decimal(principal_amount, quote_precision)
+        # Set by attach; without a database nothing is persisted
+        self.db: Optional[ValueAveragingDatabase] = None
+        self.model = None
+        self.bulk = False
+
+    def attach(
+        self,
+        db: ValueAveragingDatabase,
+        bulk: Optional[bool] = False,
+        resume: Optional[bool] = False,
+    ) -> None:
+        """
+        Record every update in the strategy's table of the database.
+
+        :param bulk: Buffer records in the database's writer.
+        :param resume: Continue from the table's last record.
+        """
+        self.db = db
+        self.model = db.get_model(self.asset_name, self.table_prefix)
+        self.bulk = bulk
+        if resume:
+            self.resume()
+
+    def resume(self) -> bool:
+        """
+        Continue from the last saved record instead of replaying the table.
+
+        Restores the interval, running totals and date from the newest row,
+        found through the primary key index, so feeding ticks to update picks
+        up where the previous run stopped. Ticks dated at or before that row
+        are skipped instead of appended again.
+
+        :return: True if a saved record was found.
+        """
+        if self.bulk:
+            self.db.writer().flush()
+        last = self.model.select().order_by(self.model.id.desc()).first()
+        if last is None:
+            return False
+
+        self.interval = last.interval + 1
+        self.last_timestamp = timestamp(last.date)
+        self.prev_total_order_size = last.total_order_size
+        self.prev_total_trade_amount = last.total_trade_amount
+        logging.info(f"Resuming {self.asset_name} at interval {self.interval}.")
+        return True
+
+    @property
+    def prev_total_order_size(self) -> Decimal:
+        return to_decimal(self.total_order_units, self.base_precision)
+
+    @prev_total_order_size.setter
+    def prev_total_order_size(self, value) -> None:
+        self.total_order_units = to_units(value, self.base_precision)
+
+    @property
+    def prev_total_trade_amount(self) -> Decimal:
+        return to_decimal(self.total_trade_units, self.quote_precision)
+
+    @prev_total_trade_amount.setter
+    def prev_total_trade_amount(self, value) -> None:
+        self.total_trade_units = to_units(value, self.quote_precision)
+
+    def places(self, precision: int) -> tuple[int, int, int]:
+        # Decimal places of (market price, trade amounts, order sizes)
+        return precision, self.quote_precision, self.base_precision
+
+    def scales(self, places: tuple[int, int, int]) -> Dict[str, int]:
+        return batch_scales(places)
+
+    def round_decimal(self, value, decimal_places) -> Decimal:
+        return to_decimal(to_units(value, decimal_places), decimal_places)
+
+    @abstractmethod
+    def step(self, price: int, places: tuple[int, int, int]) -> tuple[int, ...]:
+        """
+        The record for the current interval, without advancing any state.
+
+        :param price: Market price in price units.
+        :param places: Decimal places of (price, quote, base) units.
+        :return: One value in units per entry of `columns`.
+        """
+
+    @abstractmethod
+    def batch(
+        self, prices: Sequence[float], places: tuple[int, int, int]
+    ) -> Dict[str, np.ndarray]:
+        """
+        The records for consecutive intervals starting at the current state,
+        without advancing it.
+
+        :return: int64 columns in units, one per entry of `columns`, plus an
+            'interval' column.
+        """
+
+    def record(self, row: tuple[int, ...], datetime, places) -> None:
+        """
+        Persistence hook called by update before the state advances.
+        """
+        if self.model is None:
+            return
+
+        # Persist to database; Decimal only exists at this boundary
+        fields = {
+            "exchange": "paper",
+            "date": datetime,
+            **self.decode(row, places),
+            "interval": self.interval,
+        }
+
+        if self.bulk:
+            # Written with many others in one transaction; see BufferedWriter
+            self.db.writer().add(self.model, fields)
+            return
+
+        try:
+            self.model(**fields).save()
+            logging.info("Successfully saved the record to the database.")
+        except OperationalError as oe:
+            logging.error(f"Failed to save the record: {oe}")
+        except IntegrityError as ie:
+            logging.error(f"Integrity Error: {ie}")
+
+    def update(
+        self, market_price, datetime, precision: Optional[int] = 2
+    ) -> Optional[Dict[str, Decimal]]:
+        """
+        Advance the strategy by one tick.
+
+        :param market_price: Market price of the interval.
+        :param datetime: ISO 8601 string, datetime or UNIX seconds of the
+            interval; naive values are UTC.
+        :param precision: Decimal places of the market price.
+        :return: The record as Decimals keyed by column, plus 'interval', or
+            None if the tick is not after the last record.
+        """
+        places = self.places(precision)
+        row = self.step(to_units(market_price, precision), places)
+        return self._commit(row, datetime, places)
+
+    def update_batch(
+        self, prices: Sequence[float], timestamps: Sequence
+    ) -> Dict[str, np.ndarray]:
+        """
+        Advance the strategy over many prices at once.
+
+        Produces the same values as calling update for every price, but
+        nothing is persisted. Ticks at or before the last record are dropped,
+        so the columns may be shorter than the input.
+
+        :param prices: Market prices, one per interval.
+        :param timestamps: Matching timestamps, returned as the 'date' column.
+        :return: Columns as described by batch.
+        """
+        if len(prices) != len(timestamps):
+            raise ValueError("Prices and timestamps must have the same length.")
+
+        timestamps = np.asarray(timestamps)
+        if timestamps.dtype.kind in "iuf":
+            seconds = timestamps.astype(np.float64)
+        else:
+            seconds = np.array([timestamp(value) for value in timestamps.tolist()])
+        if self.last_timestamp is not None and len(seconds):
+            keep = seconds > self.last_timestamp
+            if not keep.all():
+                logging.warning(
+                    f"Skipping {int((~keep).sum())} {self.asset_name} ticks "
+                    "not after the last record."
+                )
+                prices = np.asarray(prices)[keep]
+                timestamps, seconds = timestamps[keep], seconds[keep]
+
+        columns = self.batch(prices, self.places(2))
+        columns["date"] = timestamps
+
+        if len(prices):
+            self.total_order_units = int(columns["total_order_size"][-1])
+            self.total_trade_units = int(columns["total_trade_amount"][-1])
+            self.interval += len(prices)
+            self.last_timestamp = float(seconds[-1])
+        return columns
+
+    def decode(self, row: tuple[int, ...], places) -> Dict[str, Decimal]:
+        scales = self.scales(places)
+        return {
+            column: to_decimal(units, scales[column])
+            for column, units in zip(self.columns, row)
+        }
+
+    def _commit(
+        self, row: tuple[int, ...], datetime, places
+    ) -> Optional[Dict[str, Decimal]]:
+        if isinstance(datetime, str):
+            datetime = parse_date(datetime)
+        seconds = timestamp(datetime)
+        if isinstance(datetime, (int, float, np.integer, np.floating)):
+            # Stored as a date, so the ledger's strftime reads see it
+            datetime = dt.fromtimestamp(seconds, timezone.utc)
+        if self.last_timestamp is not None and seconds <= self.last_timestamp:
+            logging.warning(
+                f"Skipping {self.asset_name} tick at {datetime}; "
+                "it is not after the last record."
+            )
+            return None
+        self.record(row, datetime, places)
+
+        result = self.decode(row, places)
+        result["interval"] = self.interval
+
+        # Update the running totals for the next interval
+        self.total_trade_units = row[4]
+        self.total_order_units = row[6]
+        self.interval += 1
+        self.last_timestamp = seconds
+        return result
@@ -10,4 +10,147 @@ reducing the impact of market fluctuations.
 The columns for our data table are: Datetime, Market Price, Current Target,
 Current Value, Order Size, Total Order Size, and Interval. This structure keeps
 the tabulation of our data simple and compact.
+
+Trade Amount (always the Principal Amount) and Total Trade Amount are
+tabulated as well so every strategy shares the same leading columns.
 """
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy.base import Strategy
+from coinbot.strategy.fixed_point import POW10, divide, round_half_even, to_units
+
+# Intermediate products at or above this are computed with Python ints
+_INT64_BOUND = 2**62
+
+
+def cost_average_step(
+    price: int,
+    principal: int,
+    interval: int,
+    total_order_size: int,
+    total_trade_amount: int,
+    places: tuple[int, int, int] = (2, 2, 8),
+) -> tuple[int, ...]:
+    """
+    One cost averaging record in integer fixed-point.
+
+    :param price: Market price in price units.
+    :param principal: Principal amount in quote units.
+    :param interval: Interval of the record, starting at 1.
+    :param total_order_size: Previous total order size in base units.
+    :param total_trade_amount: Previous total trade amount in quote units.
+    :param places: Decimal places of (price, quote, base) units.
+    :return: (market_price, current_target, current_value, trade_amount,
+        total_trade_amount, order_size, total_order_size) in units.
+    """
+    price_places, quote_places, base_places = places
+    P, Q, B = POW10[price_places], POW10[quote_places], POW10[base_places]
+    order_size = round_half_even(principal * P * B, Q * price)
+    return (
+        price,
+        round_half_even(principal * interval * P, Q),
+        round_half_even(price * total_order_size, B),
+        principal,
+        total_trade_amount + principal,
+        order_size,
+        total_order_size + order_size,
+    )
+
+
+def cost_average_batch(
+    prices: Sequence[float],
+    principal: int,
+    interval: int = 1,
+    prev_total_order_size: int = 0,
+    prev_total_trade_amount: int = 0,
+    places: tuple[int, int, int] = (2, 2, 8),
+) -> Dict[str, np.ndarray]:
+    """
+    Compute a whole cost averaging series with array operations.
+
+    Every order only depends on its own price, so the running totals are
+    cumulative sums. Results are identical to cost_average_step.
+
+    :param prices: Market prices, one per interval.
+    :param principal: Principal amount in quote units.
+    :return: int64 columns in units plus an 'interval' column.
+    """
+    price_places, quote_places, base_places = places
+    P, Q, B = POW10[price_places], POW10[quote_places], POW10[base_places]
+    price = np.array(
+        [to_units(p, price_places) for p in np.asarray(prices).tolist()],
+        dtype=np.int64,
+    )
+    size = len(price)
+    n = np.arange(interval, interval + size, dtype=np.int64)
+
+    numerator = principal * P * B
+    dtype = np.int64 if abs(numerator) < _INT64_BOUND else object
+    order_size = divide(numerator, price.astype(dtype) * Q).astype(np.int64)
+    total_order_size = prev_total_order_size + np.cumsum(order_size)
+    held = np.concatenate(([prev_total_order_size], total_order_size[:-1]))
+
+    bound = int(np.abs(price).max(initial=0)) * int(np.abs(held).max(initial=0))
+    dtype = np.int64 if bound < _INT64_BOUND else object
+    current_value = divide(price.astype(dtype) * held.astype(dtype), B)
+
+    return {
+        "market_price": price,
+        "current_target": divide(principal * P * n, Q),
+        "current_value": current_value.astype(np.int64),
+        "trade_amount": np.full(size, principal, dtype=np.int64),
+        "total_trade_amount": prev_total_trade_amount
+        + principal * np.arange(1, size + 1, dtype=np.int64),
+        "order_size": order_size,
+        "total_order_size": total_order_size,
+        "interval": n,
+    }
+
+
+class CostAveraging(Strategy):
+    table_prefix = "ca"
+
+    def __init__(
+        self,
+        asset_name: str,
+        principal_amount: float,
+        interval: Optional[int] = 1,
+        base_precision: Optional[int] = 8,
+        quote_precision: Optional[int] = 2,
+        resume: Optional[bool] = False,
+        db: Optional[ValueAveragingDatabase] = None,
+        bulk: Optional[bool] = False,
+    ):
+        super().__init__(
+            asset_name, principal_amount, interval, base_precision, quote_precision
+        )
+        self.principal_units = to_units(self.principal_amount, quote_precision)
+
+        if db is not None:
+            self.attach(db, bulk, resume)
+
+    def step(self, price: int, places: tuple[int, int, int]) -> tuple[int, ...]:
+        return cost_average_step(
+            price,
+            self.principal_units,
+            self.interval,
+            self.total_order_units,
+            self.total_trade_units,
+            places,
+        )
+
+    def batch(
+        self, prices: Sequence[float], places: tuple[int, int, int]
+    ) -> Dict[str, np.ndarray]:
+        return cost_average_batch(
+            prices,
+            self.principal_units,
+            self.interval,
+            self.total_order_units,
+            self.total_trade_units,
+            places,
+        )
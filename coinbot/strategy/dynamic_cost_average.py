@@ -21,3 +21,180 @@ customized by the user. Let's briefly describe each term:
 -   Min Multiplier and Max Multiplier: The lower and upper bounds of the
     Multiplier range, respectively.
 """
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy.base import COLUMNS, Strategy
+from coinbot.strategy.fixed_point import POW10, round_half_even, to_units
+
+
+def multiplier(
+    difference: int, principal: int, min_multiplier: int, max_multiplier: int
+) -> int:
+    """
+    The rounded multiplier difference / principal, banded to
+    [min_multiplier, max_multiplier] in magnitude and keeping its sign.
+
+    A zero difference buys with the min multiplier.
+    """
+    if difference == 0:
+        return min_multiplier
+    magnitude = round_half_even(abs(difference), principal)
+    magnitude = max(min_multiplier, min(magnitude, max_multiplier))
+    return magnitude if difference > 0 else -magnitude
+
+
+def dynamic_cost_average_step(
+    price: int,
+    principal: int,
+    interval: int,
+    total_order_size: int,
+    total_trade_amount: int,
+    min_multiplier: int = 1,
+    max_multiplier: int = 5,
+    places: tuple[int, int, int] = (2, 2, 8),
+) -> tuple[int, ...]:
+    """
+    One dynamic cost averaging record in integer fixed-point.
+
+    :param price: Market price in price units.
+    :param principal: Principal amount in quote units.
+    :param interval: Interval of the record, starting at 1.
+    :param total_order_size: Previous total order size in base units.
+    :param total_trade_amount: Previous total trade amount in quote units.
+    :param places: Decimal places of (price, quote, base) units.
+    :return: (market_price, current_target, current_value, trade_amount,
+        total_trade_amount, order_size, total_order_size, multiplier) in units.
+    """
+    price_places, quote_places, base_places = places
+    P, Q, B = POW10[price_places], POW10[quote_places], POW10[base_places]
+
+    current_target = round_half_even(principal * interval * P, Q)
+    current_value = round_half_even(price * total_order_size, B)
+    # Target Difference / Principal Amount, both in price units
+    factor = multiplier(
+        (current_target - current_value) * Q,
+        principal * P,
+        min_multiplier,
+        max_multiplier,
+    )
+    trade_amount = factor * principal
+    order_size = round_half_even(trade_amount * P * B, Q * price)
+    return (
+        price,
+        current_target,
+        current_value,
+        trade_amount,
+        total_trade_amount + trade_amount,
+        order_size,
+        total_order_size + order_size,
+        factor,
+    )
+
+
+def dynamic_cost_average_batch(
+    prices: Sequence[float],
+    principal: int,
+    interval: int = 1,
+    prev_total_order_size: int = 0,
+    prev_total_trade_amount: int = 0,
+    min_multiplier: int = 1,
+    max_multiplier: int = 5,
+    places: tuple[int, int, int] = (2, 2, 8),
+) -> Dict[str, np.ndarray]:
+    """
+    Compute a whole dynamic cost averaging series in one pass.
+
+    Each multiplier depends on the holdings so far, so the series is a
+    recurrence; it runs on Python ints without Decimal or persistence.
+
+    :param prices: Market prices, one per interval.
+    :param principal: Principal amount in quote units.
+    :return: int64 columns in units plus 'multiplier' and 'interval' columns.
+    """
+    size = len(prices)
+    table = np.empty((len(COLUMNS) + 1, size), dtype=np.int64)
+
+    total_order_size = prev_total_order_size
+    total_trade_amount = prev_total_trade_amount
+    for i, price in enumerate(np.asarray(prices).tolist()):
+        row = dynamic_cost_average_step(
+            to_units(price, places[0]),
+            principal,
+            interval + i,
+            total_order_size,
+            total_trade_amount,
+            min_multiplier,
+            max_multiplier,
+            places,
+        )
+        total_trade_amount, total_order_size = row[4], row[6]
+        table[:, i] = row
+
+    columns = dict(zip((*COLUMNS, "multiplier"), table))
+    columns["interval"] = np.arange(interval, interval + size, dtype=np.int64)
+    return columns
+
+
+class DynamicCostAveraging(Strategy):
+    columns = (*COLUMNS, "multiplier")
+    table_prefix = "dca"
+
+    def __init__(
+        self,
+        asset_name: str,
+        principal_amount: float,
+        min_multiplier: Optional[int] = 1,
+        max_multiplier: Optional[int] = 5,
+        interval: Optional[int] = 1,
+        base_precision: Optional[int] = 8,
+        quote_precision: Optional[int] = 2,
+        resume: Optional[bool] = False,
+        db: Optional[ValueAveragingDatabase] = None,
+        bulk: Optional[bool] = False,
+    ):
+        if not 1 <= min_multiplier <= max_multiplier:
+            raise ValueError("Multipliers must satisfy 1 <= min <= max.")
+        super().__init__(
+            asset_name, principal_amount, interval, base_precision, quote_precision
+        )
+        self.principal_units = to_units(self.principal_amount, quote_precision)
+        if self.principal_units <= 0:
+            raise ValueError("Principal amount must be positive.")
+        self.min_multiplier = min_multiplier
+        self.max_multiplier = max_multiplier
+
+        if db is not None:
+            self.attach(db, bulk, resume)
+
+    def scales(self, places: tuple[int, int, int]) -> Dict[str, int]:
+        return {**super().scales(places), "multiplier": 0}
+
+    def step(self, price: int, places: tuple[int, int, int]) -> tuple[int, ...]:
+        return dynamic_cost_average_step(
+            price,
+            self.principal_units,
+            self.interval,
+            self.total_order_units,
+            self.total_trade_units,
+            self.min_multiplier,
+            self.max_multiplier,
+            places,
+        )
+
+    def batch(
+        self, prices: Sequence[float], places: tuple[int, int, int]
+    ) -> Dict[str, np.ndarray]:
+        return dynamic_cost_average_batch(
+            prices,
+            self.principal_units,
+            self.interval,
+            self.total_order_units,
+            self.total_trade_units,
+            self.min_multiplier,
+            self.max_multiplier,
+            places,
+        )
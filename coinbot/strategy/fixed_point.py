@@ -0,0 +1,74 @@
+"""
+coinbot/strategy/fixed_point.py
+
+Integer fixed-point money arithmetic.
+
+Amounts are held as integers counting the smallest unit of their currency,
+e.g. cents (2 places) for USD or satoshis (8 places) for BTC. All rounding
+is ROUND_HALF_EVEN, matching Decimal.quantize as used by the strategies.
+Convert to Decimal only at the persistence and reporting boundaries.
+"""
+
+from decimal import Decimal
+from fractions import Fraction
+from typing import Union
+
+POW10 = tuple(10**n for n in range(32))
+
+Number = Union[int, float, str, Decimal, Fraction]
+
+
+def round_half_even(numerator: int, denominator: int) -> int:
+    """
+    numerator / denominator rounded to the nearest integer, ties to even.
+
+    :param denominator: Must be positive.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+def ratio(value: Number) -> tuple[int, int]:
+    """
+    The exact value as (numerator, denominator) with a positive denominator.
+    """
+    if isinstance(value, int):
+        return value, 1
+    if isinstance(value, (float, Decimal, Fraction)):
+        return value.as_integer_ratio()
+    return Decimal(value).as_integer_ratio()
+
+
+def to_units(value: Number, places: int) -> int:
+    """
+    Quantize a value to `places` decimals and return it in smallest units.
+
+    Equal to int(Decimal(value).quantize(Decimal(f"1e-{places}")).scaleb(places)).
+    """
+    numerator, denominator = ratio(value)
+    return round_half_even(numerator * POW10[places], denominator)
+
+
+def to_decimal(units: int, places: int) -> Decimal:
+    """
+    Smallest units back to a Decimal with exactly `places` decimals.
+    """
+    return Decimal(int(units)).scaleb(-places)
+
+
+def divide(numerator, denominator):
+    """
+    Elementwise round_half_even for NumPy integer arrays.
+
+    Works on int64 and object (Python int) arrays alike; use object arrays
+    when intermediate products may overflow int64.
+
+    :param denominator: Scalar or array; must be positive.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + up
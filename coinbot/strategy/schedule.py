@@ -0,0 +1,191 @@
+"""
+coinbot/strategy/schedule.py
+
+Precomputed Value Averaging target curves.
+
+The Current Target of interval i is
+
+    T = P * i * (1 + (r / n))^(i)
+
+as in docs/specs/04-Compound-Interest.md. TargetSchedule evaluates it once
+per interval with the same Decimal expression as
+ValueAveraging.get_target_amount, so every value is identical, and keeps the
+results. The curve extends itself when an interval past the horizon is
+requested. TargetSchedule.shared memoizes one schedule per (principal, rate,
+frequency), so every strategy instance and batch run in a process pays for
+each interval once. A schedule of minute ticks over a year holds about 60 MB
+of Decimals, so only the `shared_size` most recently used are kept; a sweep
+that draws a new rate per sample evicts the old ones instead of growing.
+Strategies keep a reference to the schedule they were handed, so evictions
+never force a live strategy to rebuild its curve.
+"""
+
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from coinbot.strategy.fixed_point import to_units
+
+
+class TargetSchedule:
+    shared_size = 2  # schedules kept by shared, least recently used evicted
+    _shared: "OrderedDict[tuple, TargetSchedule]" = OrderedDict()
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        principal_amount: Decimal,
+        interest_rate: Decimal,
+        frequency: int,
+        horizon: int = 0,
+    ):
+        """
+        :param principal_amount: Principal rounded to cents.
+        :param interest_rate: Annual interest rate rounded to cents.
+        :param frequency: Compounding periods per year.
+        :param horizon: Intervals to precompute now.
+        """
+        self.principal_amount = principal_amount
+        self.interest_rate = interest_rate
+        self.frequency = frequency
+        self._targets: List[Decimal] = []  # _targets[i - 1] is interval i
+        self._lock = threading.Lock()
+        self.extend(horizon)
+
+    @classmethod
+    def shared(
+        cls, principal_amount: Decimal, interest_rate: Decimal, frequency: int
+    ) -> "TargetSchedule":
+        """
+        The process-wide schedule for these parameters, one of at most
+        `shared_size` kept.
+        """
+        key = (principal_amount, interest_rate, frequency)
+        with cls._shared_lock:
+            schedule = cls._shared.get(key)
+            if schedule is None:
+                schedule = cls._shared[key] = cls(*key)
+                while len(cls._shared) > cls.shared_size:
+                    cls._shared.popitem(last=False)
+            else:
+                cls._shared.move_to_end(key)
+            return schedule
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._shared_lock:
+            cls._shared.clear()
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def __getitem__(self, interval: int) -> Decimal:
+        return self.target(interval)
+
+    def extend(self, horizon: int) -> None:
+        """
+        Precompute every interval up to and including `horizon`.
+        """
+        if horizon <= len(self._targets):
+            return
+        with self._lock:
+            rate_per_compounding_period = self.interest_rate / self.frequency
+            growth = 1 + rate_per_compounding_period
+            principal = self.principal_amount
+            self._targets.extend(
+                principal * interval * growth**interval
+                for interval in range(len(self._targets) + 1, horizon + 1)
+            )
+
+    def target(self, interval: int) -> Decimal:
+        """
+        The unrounded Current Target of an interval, starting at 1.
+        """
+        if interval < 1:
+            raise ValueError("Intervals start at 1.")
+        if interval > len(self._targets):
+            # Grow geometrically so a tick-by-tick walk extends rarely
+            self.extend(max(interval, 2 * len(self._targets)))
+        return self._targets[interval - 1]
+
+    def targets(self, start: int, stop: int) -> List[Decimal]:
+        """
+        Unrounded Current Targets of intervals [start, stop).
+        """
+        if start < 1:
+            raise ValueError("Intervals start at 1.")
+        self.extend(stop - 1)
+        return self._targets[start - 1 : stop - 1]
+
+    def units(self, start: int, stop: int, places: int = 2) -> np.ndarray:
+        """
+        Current Targets of intervals [start, stop) rounded to `places` and
+        returned as int64 smallest units, e.g. cents.
+        """
+        return np.array(
+            [to_units(target, places) for target in self.targets(start, stop)],
+            dtype=np.int64,
+        )
+
+    def table(
+        self, stop: int, start: int = 1, places: int = 2
+    ) -> Dict[str, np.ndarray]:
+        """
+        The compound interest table of intervals [start, stop).
+
+        :return: Columns 'interval', 'contributed' (principal * interval),
+            'accumulated' (principal * (1 + r/n)^interval, the compound
+            interest formula with nt = interval), 'current_target' and
+            'interest' (current_target - contributed), in `places` units.
+        """
+        intervals = np.arange(start, stop, dtype=np.int64)
+        growth = 1 + self.interest_rate / self.frequency
+        target = self.units(start, stop, places)
+        contributed = np.array(
+            [to_units(self.principal_amount * i, places) for i in intervals.tolist()],
+            dtype=np.int64,
+        )
+        accumulated = np.array(
+            [
+                to_units(self.principal_amount * growth**i, places)
+                for i in intervals.tolist()
+            ],
+            dtype=np.int64,
+        )
+        return {
+            "interval": intervals,
+            "contributed": contributed,
+            "accumulated": accumulated,
+            "current_target": target,
+            "interest": target - contributed,
+        }
+
+    def to_markdown(
+        self, stop: int, start: int = 1, places: int = 2, columns: Optional[list] = None
+    ) -> str:
+        """
+        The table formatted like the tables in docs/specs.
+        """
+        table = self.table(stop, start, places)
+        columns = columns or list(table)
+        headers = [name.replace("_", " ").title() for name in columns]
+        lines = [
+            "| " + " | ".join(headers) + " |",
+            "| " + " | ".join("-" * len(header) for header in headers) + " |",
+        ]
+        scale = 10**places
+        for i in range(len(table["interval"])):
+            cells = []
+            for name in columns:
+                value = int(table[name][i])
+                if name == "interval":
+                    cells.append(str(value))
+                else:
+                    sign = "-" if value < 0 else ""
+                    whole, cents = divmod(abs(value), scale)
+                    cells.append(f"{sign}{whole:,}.{cents:0{places}d}")
+            lines.append("| " + " | ".join(cells) + " |")
+        return "\n".join(lines) + "\n"
@@ -11,17 +11,172 @@ Interval. This will allow us to keep track of the relevant data and show the
 evaluated expressions as its set of results.
 """
 
-from decimal import ROUND_HALF_EVEN, Decimal
-from sqlite3 import IntegrityError, OperationalError
-from typing import Dict, List, Optional
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
 
-from iso8601 import parse_date
+import numpy as np
 
-from coinbot import logging
 from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy.base import Strategy, batch_scales
+from coinbot.strategy.fixed_point import POW10, to_decimal, to_units
+from coinbot.strategy.schedule import TargetSchedule
 
+BATCH_SCALES = batch_scales()
 
-class ValueAveraging:
+# Integer results closer than 1e-12 of a unit to a rounding tie are recomputed
+# in Decimal, where the 28-digit context rounding could tip the result.
+_TIE_TOLERANCE = 10**12
+_MAX_UNITS = 10**15
+
+
+def _round(numerator: int, denominator: int) -> Optional[int]:
+    # round_half_even, or None when the result is too close to call
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if abs(twice - denominator) * _TIE_TOLERANCE < denominator:
+        return None
+    if abs(quotient) > _MAX_UNITS:
+        return None
+    return quotient + 1 if twice > denominator else quotient
+
+
+def _decimal_step(
+    price: int,
+    target: Decimal,
+    first: bool,
+    total_order_size: int,
+    total_trade_amount: int,
+    places: tuple[int, int, int],
+) -> tuple[int, ...]:
+    # The reference arithmetic of initialize_first_record/update_records
+    price_places, quote_places, base_places = places
+    market_price = to_decimal(price, price_places)
+    prev_total_order_size = to_decimal(total_order_size, base_places)
+    prev_total_trade_amount = to_decimal(total_trade_amount, quote_places)
+
+    current_value = market_price * prev_total_order_size
+    trade_amount = target - current_value
+    if first:
+        order_size = target / market_price
+    else:
+        order_size = trade_amount / market_price
+    return (
+        price,
+        to_units(target, price_places),
+        to_units(current_value, price_places),
+        to_units(trade_amount, quote_places),
+        to_units(trade_amount + prev_total_trade_amount, quote_places),
+        to_units(order_size, base_places),
+        to_units(order_size + prev_total_order_size, base_places),
+    )
+
+
+def value_average_step(
+    price: int,
+    target: Decimal,
+    first: bool,
+    total_order_size: int,
+    total_trade_amount: int,
+    places: tuple[int, int, int] = (2, 2, 8),
+) -> tuple[int, ...]:
+    """
+    One value averaging record in integer fixed-point.
+
+    :param price: Market price in price units.
+    :param target: Unrounded current target (the principal for the first record).
+    :param first: True for the first record, where order size is target / price.
+    :param total_order_size: Previous total order size in base units.
+    :param total_trade_amount: Previous total trade amount in quote units.
+    :param places: Decimal places of (price, quote, base) units.
+    :return: (market_price, current_target, current_value, trade_amount,
+        total_trade_amount, order_size, total_order_size) in units.
+    """
+    price_places, quote_places, base_places = places
+    P, Q, B = POW10[price_places], POW10[quote_places], POW10[base_places]
+    tn, td = target.as_integer_ratio()
+
+    # trade_amount = target - price * total_order_size == A / D exactly
+    held = price * total_order_size
+    A = tn * P * B - held * td
+    D = td * P * B
+    # order_size = trade_amount / price, or target / price on the first record
+    N = tn * P if first else A * P
+    M = (td if first else D) * price
+
+    row = (
+        price,
+        _round(tn * P, td),
+        _round(held, B),
+        _round(A * Q, D),
+        _round(A * Q + total_trade_amount * D, D),
+        _round(N * B, M),
+        _round(N * B + total_order_size * M, M),
+    )
+    if None in row:
+        return _decimal_step(
+            price, target, first, total_order_size, total_trade_amount, places
+        )
+    return row
+
+
+def value_average_batch(
+    prices: Sequence[float],
+    principal_amount: Decimal,
+    interest_rate: Decimal,
+    frequency: int,
+    interval: int = 1,
+    prev_total_order_size: int = 0,
+    prev_total_trade_amount: int = 0,
+    places: tuple[int, int, int] = (2, 2, 8),
+    schedule: Optional[TargetSchedule] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Compute a whole value averaging series in one pass.
+
+    Results are identical to ValueAveraging.initialize_first_record (for
+    interval 1) followed by ValueAveraging.update_records, without date
+    parsing or persistence.
+
+    :param prices: Market prices, one per interval.
+    :param principal_amount: Principal rounded to cents.
+    :param interest_rate: Annual interest rate as used by get_target_amount.
+    :param frequency: Compounding periods per year.
+    :param interval: Interval of the first price.
+    :param prev_total_order_size: Running base total in base units.
+    :param prev_total_trade_amount: Running quote total in quote units.
+    :param places: Decimal places of (price, quote, base) units.
+    :param schedule: Target schedule of these parameters. Default is the
+        process-wide TargetSchedule.shared one.
+    :return: int64 columns in units (see batch_scales) plus an 'interval' column.
+    """
+    size = len(prices)
+    table = np.empty((7, size), dtype=np.int64)
+    if schedule is None:
+        schedule = TargetSchedule.shared(principal_amount, interest_rate, frequency)
+    targets = schedule.targets(interval, interval + size)
+
+    total_order_size = prev_total_order_size
+    total_trade_amount = prev_total_trade_amount
+    for i, price in enumerate(np.asarray(prices).tolist()):
+        first = interval + i == 1
+        target = principal_amount if first else targets[i]
+        row = value_average_step(
+            to_units(price, places[0]),
+            target,
+            first,
+            total_order_size,
+            total_trade_amount,
+            places,
+        )
+        total_trade_amount, total_order_size = row[4], row[6]
+        table[:, i] = row
+
+    columns = dict(zip(batch_scales(places), table))
+    columns["interval"] = np.arange(interval, interval + size, dtype=np.int64)
+    return columns
+
+
+class ValueAveraging(Strategy):
     def __init__(
         self,
         asset_name: str,
@@ -31,21 +186,23 @@ class ValueAveraging:
         interval: Optional[int] = 1,
         base_precision: Optional[int] = 8,
         quote_precision: Optional[int] = 2,
+        resume: Optional[bool] = False,
+        db: Optional[ValueAveragingDatabase] = None,
+        bulk: Optional[bool] = False,
+        persist: Optional[bool] = True,
     ):
-        self.asset_name = asset_name  # set the asset name
-        self.db = ValueAveragingDatabase()  # create peewee database
-        self.model = self.db.get_model(asset_name)  # create model and open db
-        self.interval = 1
-        self.prev_total_order_size = self.round_decimal("0", base_precision)
-        self.prev_total_trade_amount = self.round_decimal("0", base_precision)
-        self.principal_amount = self.round_decimal(principal_amount, quote_precision)
+        super().__init__(
+            asset_name, principal_amount, interval, base_precision, quote_precision
+        )
         self.interest_rate = self.round_decimal(interest_rate, quote_precision)
         self.frequency = frequency
-
-    def round_decimal(self, value, decimal_places) -> Decimal:
-        return Decimal(value).quantize(
-            Decimal(f"1e-{decimal_places}"), rounding=ROUND_HALF_EVEN
+        # Held for the strategy's lifetime; the shared LRU only hands it out
+        self.schedule = TargetSchedule.shared(
+            self.principal_amount, self.interest_rate, self.frequency
         )
+        if persist:
+            # False keeps the records in memory and never opens a database
+            self.attach(db or ValueAveragingDatabase(), bulk, resume)
 
     def calculate_trade_amount(self, target_amount: float, current_value: float):
         # Calculate the trade amount as the difference between the target amount and the current value
@@ -53,107 +210,59 @@ class ValueAveraging:
         return current_trade_amount
 
     def get_target_amount(self, interval: int):
-        rate_per_compounding_period = self.interest_rate / self.frequency
-
         # Calculate the Current Target amount using the adapted Value Averaging formula
-        current_target_amount = (
-            self.principal_amount
-            * interval
-            * (1 + rate_per_compounding_period) ** interval
+        return self.schedule.target(interval)
+
+    def step(self, price: int, places: tuple[int, int, int]) -> tuple[int, ...]:
+        # The first target is the principal and buys principal / price
+        first = self.interval == 1
+        return value_average_step(
+            price,
+            self.principal_amount if first else self.get_target_amount(self.interval),
+            first,
+            self.total_order_units,
+            self.total_trade_units,
+            places,
+        )
+
+    def batch(
+        self, prices: Sequence[float], places: tuple[int, int, int]
+    ) -> Dict[str, np.ndarray]:
+        return value_average_batch(
+            prices,
+            self.principal_amount,
+            self.interest_rate,
+            self.frequency,
+            self.interval,
+            self.total_order_units,
+            self.total_trade_units,
+            places,
+            self.schedule,
         )
-        return current_target_amount
 
     def initialize_first_record(
         self, market_price: float, datetime: str, precision: Optional[int] = 2
     ):
-        datetime = parse_date(datetime)
-        market_price = self.round_decimal(market_price, precision)
-        current_target = self.principal_amount  # Initial principal amount
-        order_size = self.principal_amount / market_price
-        total_order_size = order_size + self.prev_total_order_size
-        current_value = market_price * self.prev_total_order_size
-        trade_amount = self.principal_amount - current_value
-        total_trade_amount = trade_amount + self.prev_total_trade_amount
-
-        # Rounding for precision
-        current_value = self.round_decimal(current_value, precision)
-        order_size = self.round_decimal(
-            order_size, 8
-        )  # Rounded to 8 decimal places for satoshis
-        total_order_size = self.round_decimal(total_order_size, 8)
-        trade_amount = self.round_decimal(
-            trade_amount, 2
-        )  # Rounded to 2 decimal places for cents
-        total_trade_amount = self.round_decimal(total_trade_amount, 2)
-
-        # Persist to database
-        record = self.model(
-            exchange="paper",
-            date=datetime,
-            market_price=market_price,
-            current_target=current_target,
-            current_value=current_value,
-            trade_amount=trade_amount,
-            total_trade_amount=total_trade_amount,
-            order_size=order_size,
-            total_order_size=total_order_size,
-            interval=self.interval,
+        # The first target is the principal and buys principal / price
+        places = self.places(precision)
+        row = value_average_step(
+            to_units(market_price, precision),
+            self.principal_amount,
+            True,
+            self.total_order_units,
+            self.total_trade_units,
+            places,
         )
-
-        try:
-            record.save()
-            logging.info("Successfully saved the record to the database.")
-        except OperationalError as oe:
-            logging.error(f"Failed to save the record: {oe}")
-        except IntegrityError as ie:
-            logging.error(f"Integrity Error: {ie}")
-
-        # Update the class variables for next calculations
-        self.prev_total_order_size = total_order_size
-        self.prev_total_trade_amount = total_trade_amount
-        self.interval += 1
+        return self._commit(row, datetime, places)
 
     def update_records(self, market_price, datetime, precision: Optional[int] = 2):
-        datetime = parse_date(datetime)
-        market_price = self.round_decimal(market_price, precision)
-        current_target = self.get_target_amount(self.interval)
-        current_value = market_price * self.prev_total_order_size
-        trade_amount = self.calculate_trade_amount(current_target, current_value)
-        total_trade_amount = trade_amount + self.prev_total_trade_amount
-        order_size = trade_amount / market_price
-        total_order_size = order_size + self.prev_total_order_size
-
-        # Rounding for precision
-        current_target = self.round_decimal(current_target, precision)
-        current_value = self.round_decimal(current_value, precision)
-        order_size = self.round_decimal(order_size, 8)
-        total_order_size = self.round_decimal(total_order_size, 8)
-        trade_amount = self.round_decimal(trade_amount, 2)
-        total_trade_amount = self.round_decimal(total_trade_amount, 2)
-
-        # Persist to database
-        record = self.model(
-            exchange="paper",
-            date=datetime,
-            market_price=market_price,
-            current_target=current_target,
-            current_value=current_value,
-            trade_amount=trade_amount,
-            total_trade_amount=total_trade_amount,
-            order_size=order_size,
-            total_order_size=total_order_size,
-            interval=self.interval,
+        places = self.places(precision)
+        row = value_average_step(
+            to_units(market_price, precision),
+            self.get_target_amount(self.interval),
+            False,
+            self.total_order_units,
+            self.total_trade_units,
+            places,
         )
-
-        try:
-            record.save()
-            logging.info("Successfully saved the record to the database.")
-        except OperationalError as oe:
-            logging.error(f"Failed to save the record: {oe}")
-        except IntegrityError as ie:
-            logging.error(f"Integrity Error: {ie}")
-
-        # Update the class variables for next calculations
-        self.prev_total_order_size = total_order_size
-        self.prev_total_trade_amount = total_trade_amount
-        self.interval += 1
+        return self._commit(row, datetime, places)
@@ -0,0 +1,282 @@
+"""
+coinbot/sweep.py
+
+Parameter sweeps for Value Averaging.
+
+Runs value_average_batch for every combination of principal amount, interest
+rate and frequency over every asset's price history. The histories are
+copied once into shared memory and the worker processes read them in place,
+so adding workers adds throughput without copying the data per task.
+"""
+
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import click
+import numpy as np
+
+from coinbot import logging
+from coinbot.strategy.value_average import BATCH_SCALES, value_average_batch
+
+
+@dataclass
+class SweepResult:
+    asset: str
+    principal_amount: float
+    interest_rate: float
+    frequency: int
+    final_value: float  # holdings at the last price
+    total_invested: float  # net quote spent (buys minus sells)
+    capital_required: float  # peak net quote spent
+    max_drawdown: float  # largest peak-to-trough fall of profit, in quote
+    trade_count: int
+
+
+def grid(
+    principal: Sequence[float], rate: Sequence[float], frequency: Sequence[int]
+) -> List[tuple]:
+    return list(itertools.product(principal, rate, frequency))
+
+
+def random_samples(
+    principal: Sequence[float],
+    rate: Sequence[float],
+    frequency: Sequence[int],
+    samples: int,
+    seed: Optional[int] = None,
+) -> List[tuple]:
+    """
+    Uniform samples within [min, max] of each parameter.
+    """
+    rng = np.random.default_rng(seed)
+    return _scale(rng.random((samples, 3)), principal, rate, frequency)
+
+
+def latin_hypercube(
+    principal: Sequence[float],
+    rate: Sequence[float],
+    frequency: Sequence[int],
+    samples: int,
+    seed: Optional[int] = None,
+) -> List[tuple]:
+    """
+    Latin hypercube samples: each parameter range is cut into `samples`
+    strata and every stratum is used exactly once.
+    """
+    rng = np.random.default_rng(seed)
+    strata = np.stack([rng.permutation(samples) for _ in range(3)], axis=1)
+    unit = (strata + rng.random((samples, 3))) / samples
+    return _scale(unit, principal, rate, frequency)
+
+
+def _scale(unit: np.ndarray, principal, rate, frequency) -> List[tuple]:
+    bounds = [(min(p), max(p)) for p in (principal, rate, frequency)]
+    lo = np.array([b[0] for b in bounds], dtype=np.float64)
+    hi = np.array([b[1] for b in bounds], dtype=np.float64)
+    points = lo + unit * (hi - lo)
+    return [
+        (round(float(p), 2), round(float(r), 2), max(1, int(round(f))))
+        for p, r, f in points
+    ]
+
+
+# Worker-process state, set once per process by _attach
+_prices: Dict[str, np.ndarray] = {}
+_memory: Optional[shared_memory.SharedMemory] = None
+
+
+def _attach(name: str, layout: Dict[str, tuple]) -> None:
+    global _memory, _prices
+    _memory = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((_memory.size // 8,), dtype=np.float64, buffer=_memory.buf)
+    _prices = {asset: block[lo:hi] for asset, (lo, hi) in layout.items()}
+
+
+def evaluate(
+    asset: str,
+    prices: np.ndarray,
+    principal_amount: float,
+    interest_rate: float,
+    frequency: int,
+) -> SweepResult:
+    columns = value_average_batch(
+        prices,
+        Decimal(str(principal_amount)).quantize(Decimal("0.01")),
+        Decimal(str(interest_rate)).quantize(Decimal("0.01")),
+        frequency,
+    )
+    quote = 10.0 ** BATCH_SCALES["total_trade_amount"]
+    base = 10.0 ** BATCH_SCALES["total_order_size"]
+    price = columns["market_price"] / 10.0 ** BATCH_SCALES["market_price"]
+    holdings = columns["total_order_size"] / base * price
+    invested = columns["total_trade_amount"] / quote
+    profit = holdings - invested
+    drawdown = np.maximum.accumulate(profit) - profit
+
+    return SweepResult(
+        asset=asset,
+        principal_amount=principal_amount,
+        interest_rate=interest_rate,
+        frequency=frequency,
+        final_value=float(holdings[-1]) if len(holdings) else 0.0,
+        total_invested=float(invested[-1]) if len(invested) else 0.0,
+        capital_required=float(invested.max(initial=0.0)),
+        max_drawdown=float(drawdown.max(initial=0.0)),
+        trade_count=int(np.count_nonzero(columns["order_size"])),
+    )
+
+
+def _run(task: tuple) -> SweepResult:
+    asset, principal_amount, interest_rate, frequency = task
+    return evaluate(asset, _prices[asset], principal_amount, interest_rate, frequency)
+
+
+def sweep(
+    prices: Dict[str, np.ndarray],
+    combinations: Sequence[tuple],
+    workers: Optional[int] = None,
+) -> Iterator[SweepResult]:
+    """
+    Evaluate every (principal, rate, frequency) combination on every asset.
+
+    :param prices: Price history per asset.
+    :param combinations: Tuples of (principal_amount, interest_rate, frequency).
+    :param workers: Worker processes; defaults to the CPU count.
+    :return: Results ordered by combination, then asset.
+    """
+    layout, offset = {}, 0
+    for asset, series in prices.items():
+        layout[asset] = (offset, offset + len(series))
+        offset += len(series)
+
+    memory = shared_memory.SharedMemory(create=True, size=max(8, offset * 8))
+    try:
+        block = np.ndarray((offset,), dtype=np.float64, buffer=memory.buf)
+        for asset, (lo, hi) in layout.items():
+            block[lo:hi] = prices[asset]
+        del block  # release the export before the segment is closed
+
+        # Combination-major, so a worker's chunk reuses one target schedule
+        # across assets instead of evicting it from the shared LRU
+        tasks = [(asset, *combo) for combo in combinations for asset in prices]
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach, initargs=(memory.name, layout)
+        ) as pool:
+            yield from pool.map(_run, tasks, chunksize=chunksize)
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def write_summary(results: Sequence[SweepResult], path: str) -> None:
+    fields = list(SweepResult.__dataclass_fields__)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(asdict(result))
+
+
+def _floats(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+@click.command()
+@click.option(
+    "--assets",
+    default="BTC-USD",
+    help="Comma separated product IDs read from the candle store. Default is BTC-USD.",
+)
+@click.option("--start", required=True, help="Start date. Format: ISO 8601.")
+@click.option("--end", required=True, help="End date. Format: ISO 8601.")
+@click.option(
+    "--granularity",
+    default="ONE_DAY",
+    help="Candle granularity. Default is ONE_DAY.",
+)
+@click.option(
+    "--store",
+    default="candles",
+    help="Candle store directory. Default is candles.",
+)
+@click.option(
+    "--principal",
+    default="10,50,100",
+    help="Comma separated principal amounts. Default is 10,50,100.",
+)
+@click.option(
+    "--rate",
+    default="0.05,0.10,0.20",
+    help="Comma separated annual interest rates. Default is 0.05,0.10,0.20.",
+)
+@click.option(
+    "--frequency",
+    default="12,52,365",
+    help="Comma separated compounding frequencies. Default is 12,52,365.",
+)
+@click.option(
+    "--sampler",
+    type=click.Choice(["grid", "random", "lhs"]),
+    default="grid",
+    help="How to pick combinations. random and lhs sample within [min, max].",
+)
+@click.option("--samples", default=64, help="Samples for random and lhs.")
+@click.option("--seed", default=None, type=click.INT, help="Sampler seed.")
+@click.option("--workers", default=None, type=click.INT, help="Worker processes.")
+@click.option(
+    "--output",
+    default="sweep.csv",
+    help="Summary CSV path. Default is sweep.csv.",
+)
+def main(
+    assets,
+    start,
+    end,
+    granularity,
+    store,
+    principal,
+    rate,
+    frequency,
+    sampler,
+    samples,
+    seed,
+    workers,
+    output,
+):
+    from coinbot.store import CandleStore
+
+    candles = CandleStore(root=store)
+    prices = {}
+    for asset in assets.split(","):
+        close = candles.load(asset, granularity, start, end)["close"]
+        if not len(close):
+            logging.warning(f"No stored candles for {asset}; run the store first")
+            continue
+        prices[asset] = np.asarray(close, dtype=np.float64)
+    if not prices:
+        return
+
+    principal, rate = _floats(principal), _floats(rate)
+    frequency = [int(f) for f in _floats(frequency)]
+    if sampler == "grid":
+        combinations = grid(principal, rate, frequency)
+    elif sampler == "random":
+        combinations = random_samples(principal, rate, frequency, samples, seed)
+    else:
+        combinations = latin_hypercube(principal, rate, frequency, samples, seed)
+
+    results = list(sweep(prices, combinations, workers))
+    write_summary(results, output)
+    logging.info(f"Wrote {len(results)} results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -104,14 +104,12 @@ def main():
     #     frequency=frequency,  # Using daily candlesticks
     #     interval=interval,  # Starting interval
     # )
-    # Connect to database and get model
-    db = ValueAveragingDatabase(database)
+    # Connect read-only so analysis never blocks the trading writer
+    db = ValueAveragingDatabase(database).replica()
     db.connect()
-    asset_model = db.get_model(symbol)
 
-    # Query data and convert to DataFrame
-    data = list(asset_model.select().dicts())
-    df = pd.DataFrame(data)
+    # Query data straight into a DataFrame
+    df = db.frame(symbol)
     ...
 
 
@@ -0,0 +1,517 @@
+"""
+tests/bench.py
+
+Benchmarks for the project's hot paths.
+
+This module is not collected by pytest. Run it directly:
+
+    python -m tests.bench                             # run everything
+    python -m tests.bench -k va_ -k paginate          # run a subset
+    python -m tests.bench --output bench.json         # write results
+    python -m tests.bench --baseline baseline.json    # fail on regressions
+
+Every benchmark uses fixed, seeded synthetic data and runs in a temporary
+working directory. Results are the best and median wall time of several
+repeats. A benchmark regresses when its best time exceeds the baseline's by
+more than the threshold. Baselines are machine specific, so keep them out
+of the repository and record one per machine with --output.
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+from urllib.parse import parse_qs, urlparse
+
+import click
+import numpy as np
+
+SEED = 42
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(name: str):
+    """
+    Register a benchmark. The function receives the repeat count and
+    returns (seconds per repeat, items per repeat).
+    """
+
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+
+    return register
+
+
+def prices(size: int) -> np.ndarray:
+    # A fixed daily GBM path around 30k, rounded to cents
+    rng = np.random.default_rng(SEED)
+    returns = rng.normal(0.0002, 0.03, size)
+    return np.round(30000 * np.exp(np.cumsum(returns)), 2)
+
+
+def dates(size: int) -> list[str]:
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp()
+    return [
+        datetime.fromtimestamp(start + 86400 * i, timezone.utc).isoformat()
+        for i in range(size)
+    ]
+
+
+def timed(setup: Callable, run: Callable, repeat: int) -> list[float]:
+    seconds = []
+    for i in range(repeat):
+        state = setup(i)
+        started = time.perf_counter()
+        run(state)
+        seconds.append(time.perf_counter() - started)
+    return seconds
+
+
+@benchmark("va_update_records")
+def bench_update_records(repeat: int):
+    from coinbot.strategy.value_average import ValueAveraging
+
+    size = 500
+    series, stamps = prices(size).tolist(), dates(size)
+
+    def setup(i):
+        return ValueAveraging(f"bench{i}", 10, 0.10, 365, resume=False)
+
+    def run(va):
+        va.initialize_first_record(series[0], stamps[0])
+        for price, stamp in zip(series[1:], stamps[1:]):
+            va.update_records(price, stamp)
+        va.db.close()
+
+    return timed(setup, run, repeat), size
+
+
+@benchmark("va_update_batch")
+def bench_update_batch(repeat: int):
+    from coinbot.strategy.value_average import ValueAveraging
+
+    size = 10000
+    series, stamps = prices(size), np.arange(size)
+
+    def setup(i):
+        return ValueAveraging(f"batch{i}", 10, 0.10, 365, resume=False)
+
+    return timed(setup, lambda va: va.update_batch(series, stamps), repeat), size
+
+
+def _cost_averaging(kind: str, batch: bool):
+    # Cost averaging ("ca") or dynamic cost averaging ("dca"), ticked and
+    # persisted one record at a time or run over the series in one batch
+    def bench(repeat: int):
+        from coinbot.db import ValueAveragingDatabase
+        from coinbot.strategy.cost_average import CostAveraging
+        from coinbot.strategy.dynamic_cost_average import DynamicCostAveraging
+
+        size = 10000 if batch else 500
+        series = prices(size)
+        stamps = np.arange(size) if batch else dates(size)
+        cls = CostAveraging if kind == "ca" else DynamicCostAveraging
+
+        def setup(i):
+            if batch:
+                return cls(f"batch{i}", 10)
+            return cls(f"bench{i}", 10, db=ValueAveragingDatabase())
+
+        def run(strategy):
+            if batch:
+                strategy.update_batch(series, stamps)
+                return
+            for price, stamp in zip(series.tolist(), stamps):
+                strategy.update(price, stamp)
+            strategy.db.close()
+
+        return timed(setup, run, repeat), size
+
+    return bench
+
+
+for _kind in ("ca", "dca"):
+    benchmark(f"{_kind}_update")(_cost_averaging(_kind, False))
+    benchmark(f"{_kind}_update_batch")(_cost_averaging(_kind, True))
+
+
+def _records(size: int) -> list[dict]:
+    from decimal import Decimal
+
+    series = prices(size)
+    return [
+        {
+            "exchange": "paper",
+            "date": datetime(2020, 1, 1),
+            "market_price": Decimal(str(price)),
+            "current_target": Decimal("10.00"),
+            "current_value": Decimal("9.50"),
+            "trade_amount": Decimal("0.50"),
+            "total_trade_amount": Decimal("10.00"),
+            "order_size": Decimal("0.00001667"),
+            "total_order_size": Decimal("0.00033333"),
+            "interval": i + 1,
+        }
+        for i, price in enumerate(series.tolist())
+    ]
+
+
+@benchmark("db_write")
+def bench_db_write(repeat: int):
+    from coinbot.db import ValueAveragingDatabase
+
+    size = 2000
+    database = ValueAveragingDatabase("bench.sqlite")
+
+    def setup(i):
+        model = database.get_model(f"write{i}")
+        return model, _records(size)
+
+    def run(state):
+        model, records = state
+        with database.db.atomic():
+            for record in records:
+                model.create(**record)
+
+    seconds = timed(setup, run, repeat)
+    database.close()
+    return seconds, size
+
+
+@benchmark("db_read")
+def bench_db_read(repeat: int):
+    from coinbot.db import ValueAveragingDatabase
+
+    size = 20000
+    database = ValueAveragingDatabase("bench.sqlite")
+    model = database.get_model("read")
+    with database.db.atomic():
+        model.insert_many(_records(size)).execute()
+
+    def run(_):
+        rows = list(model.select().order_by(model.id).dicts())
+        assert len(rows) == size
+
+    seconds = timed(lambda i: None, run, repeat)
+    database.close()
+    return seconds, size
+
+
+def _large(name: str, pragmas, size: int = 100000):
+    # A va_ table holding `size` rows, built in one batch
+    from coinbot.db import ValueAveragingDatabase
+
+    database = ValueAveragingDatabase(name, pragmas)
+    model = database.get_model("large")
+    with database.writer(size) as writer:
+        writer.extend(model, _records(size))
+    return database, model
+
+
+def _commit(name: str, pragmas):
+    size = 1000
+
+    def bench(repeat: int):
+        # One transaction per record, as the live trading writer saves them
+        database, model = _large(f"commit_{name}.sqlite", pragmas)
+        records = _records(size)
+
+        def run(_):
+            for record in records:
+                model.create(**record)
+
+        seconds = timed(lambda i: None, run, repeat)
+        database.close()
+        return seconds, size
+
+    return bench
+
+
+def _scan(name: str, pragmas):
+    queries, rows = 100, 200
+
+    def bench(repeat: int):
+        # Random interval ranges through a read-only replica while another
+        # thread keeps committing records, as the live trading writer does
+        database, model = _large(f"scan_{name}.sqlite", pragmas)
+        replica = database.replica()
+        reader = replica.get_model("large")
+        rng = np.random.default_rng(SEED)
+        starts = rng.integers(1, model.select().count() - rows, queries).tolist()
+        record, stop = _records(1)[0], threading.Event()
+
+        def write():
+            while not stop.is_set():
+                model.create(**record)
+            database.close()
+
+        def run(_):
+            for start in starts:
+                query = reader.select().where(reader.id.between(start, start + rows))
+                assert len(list(query.tuples())) == rows + 1
+
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        try:
+            seconds = timed(lambda i: None, run, repeat)
+        finally:
+            stop.set()
+            writer.join()
+        replica.close()
+        database.close()
+        return seconds, queries * rows
+
+    return bench
+
+
+# SQLite's own defaults against coinbot.db.PRAGMAS (None selects it)
+for _name, _pragmas in {"default": {}, "tuned": None}.items():
+    benchmark(f"db_commit_{_name}")(_commit(_name, _pragmas))
+    benchmark(f"db_scan_{_name}")(_scan(_name, _pragmas))
+
+
+@benchmark("db_query")
+def bench_db_query(repeat: int):
+    from coinbot.db import ValueAveragingDatabase
+
+    size = 20000
+    database = ValueAveragingDatabase("bench.sqlite")
+    model = database.get_model("query")
+    with database.db.atomic():
+        model.insert_many(_records(size)).execute()
+
+    def run(_):
+        columns = database.read("query")
+        assert len(columns["id"]) == size
+
+    seconds = timed(lambda i: None, run, repeat)
+    database.close()
+    return seconds, size
+
+
+class _Pages(BaseHTTPRequestHandler):
+    pages = 200
+    items = 100
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        cursor = int(query.get("cursor", ["0"])[0])
+        body = json.dumps(
+            {
+                "orders": [
+                    {"order_id": f"{cursor}-{i}", "product_id": "BTC-USD"}
+                    for i in range(self.items)
+                ],
+                "has_next": cursor + 1 < self.pages,
+                "cursor": str(cursor + 1),
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _client(url: str):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    from coinbot.coinbase.client import API, Auth, Client
+    from coinbot.coinbase.limiter import RateLimiter, TokenBucket
+
+    secret = (
+        ec.generate_private_key(ec.SECP256R1())
+        .private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        .decode()
+    )
+    api = API({"key": "bench", "secret": secret, "rest": url})
+    # Unthrottled so the benchmark measures the client, not the rate limit
+    limiter = RateLimiter(TokenBucket(1e9), TokenBucket(1e9))
+    return Client(api, Auth(api), limiter=limiter)
+
+
+def _paginate(repeat: int, prefetch: int):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Pages)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = _client(f"http://127.0.0.1:{server.server_port}")
+    size = _Pages.pages * _Pages.items
+
+    def run(_):
+        count = sum(
+            1
+            for _ in client.paginate(
+                "orders/historical/batch", "orders", prefetch=prefetch
+            )
+        )
+        assert count == size
+
+    try:
+        return timed(lambda i: None, run, repeat), size
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@benchmark("paginate")
+def bench_paginate(repeat: int):
+    return _paginate(repeat, prefetch=0)
+
+
+@benchmark("paginate_prefetch")
+def bench_paginate_prefetch(repeat: int):
+    return _paginate(repeat, prefetch=4)
+
+
+def _trainer(width: int, epochs: int):
+    from coinbot.model.dense import Trainer
+
+    rng = np.random.default_rng(SEED)
+    X = rng.random((512, 8))
+    y = np.tanh(X @ rng.random((8, 1)))
+    architecture = [
+        {"type": "Dense", "input_dim": 8, "output_dim": width},
+        {"type": "Tanh"},
+        {"type": "Dense", "input_dim": width, "output_dim": width},
+        {"type": "Tanh"},
+        {"type": "Dense", "input_dim": width, "output_dim": 1},
+    ]
+    # A negative tolerance never stops early, so every repeat runs all epochs
+    np.random.seed(SEED)
+    return Trainer(X, y, architecture, epochs=epochs, tolerance=-1)
+
+
+def _dense(width: int):
+    epochs = 50
+
+    def bench(repeat: int):
+        seconds = timed(
+            lambda i: _trainer(width, epochs),
+            lambda trainer: trainer.run_training(),
+            repeat,
+        )
+        return seconds, epochs
+
+    return bench
+
+
+for _width in (16, 64, 256):
+    benchmark(f"dense_epoch_{_width}")(_dense(_width))
+
+
+@benchmark("hdf5_save_load")
+def bench_hdf5(repeat: int):
+    trainer = _trainer(256, 1)
+    trainer.run_training()
+
+    def run(_):
+        trainer.save_model("bench.h5")
+        trainer.load_model("bench.h5")
+
+    return timed(lambda i: None, run, repeat), 1
+
+
+def run_benchmarks(names: list[str], repeat: int) -> dict:
+    results = {}
+    for name in names:
+        seconds, items = BENCHMARKS[name](repeat)
+        best = min(seconds)
+        results[name] = {
+            "best": best,
+            "median": statistics.median(seconds),
+            "items": items,
+            "rate": items / best if best else None,
+        }
+        click.echo(f"{name:<24} {best:10.4f}s {items / best:14.1f}/s")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Names of benchmarks slower than the baseline by more than threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = result["best"] / reference["best"]
+        marker = "REGRESSION" if ratio > 1 + threshold else ""
+        click.echo(f"{name:<24} {ratio:8.2f}x {marker}")
+        if marker:
+            regressions.append(name)
+    return regressions
+
+
+@click.command()
+@click.option(
+    "-k",
+    "selected",
+    multiple=True,
+    help="Run benchmarks whose name contains this text. Repeatable.",
+)
+@click.option("--repeat", default=5, help="Repeats per benchmark. Default is 5.")
+@click.option("--output", default=None, help="Write results to this JSON file.")
+@click.option("--baseline", default=None, help="Compare against this JSON file.")
+@click.option(
+    "--threshold",
+    default=0.20,
+    help="Allowed slowdown before a regression is reported. Default is 0.20.",
+)
+def main(selected, repeat, output, baseline, threshold):
+    names = [
+        name
+        for name in BENCHMARKS
+        if not selected or any(text in name for text in selected)
+    ]
+    output = os.path.abspath(output) if output else None
+    baseline = os.path.abspath(baseline) if baseline else None
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)  # the databases and model files are written here
+        try:
+            results = run_benchmarks(names, repeat)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if baseline:
+        with open(baseline, "r") as f:
+            regressions = compare(results, json.load(f)["results"], threshold)
+        if regressions:
+            click.echo(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
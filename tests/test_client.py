@@ -0,0 +1,196 @@
+"""
+tests/test_client.py
+
+Retries, pagination and read-ahead against a local stub server.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from coinbot.coinbase.client import API, Auth, Client, PaginationError
+from coinbot.coinbase.limiter import RateLimiter, TokenBucket
+from coinbot.coinbase.transport import RetryPolicy, read_ahead
+
+
+class Stub(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.reply()
+
+    def do_POST(self):
+        self.reply()
+
+    def reply(self):
+        url = urlparse(self.path)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.requests.append((self.command, url.path, query))
+        status, headers, payload = self.server.respond(self.command, query)
+
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def page(query: dict, pages: int = 10**6, items: int = 10):
+    # Endless unless `pages` is given; the cursor is the page number
+    cursor = int(query.get("cursor", "0"))
+    return {
+        "orders": [{"order_id": f"{cursor}-{i}"} for i in range(items)],
+        "has_next": cursor + 1 < pages,
+        "cursor": str(cursor + 1),
+    }
+
+
+@pytest.fixture
+def server():
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    stub.requests = []
+    stub.respond = lambda method, query: (200, {}, page(query))
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def client(server):
+    secret = (
+        ec.generate_private_key(ec.SECP256R1())
+        .private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        .decode()
+    )
+    url = f"http://127.0.0.1:{server.server_port}"
+    api = API({"key": "test", "secret": secret, "rest": url})
+    client = Client(
+        api,
+        Auth(api),
+        limiter=RateLimiter(TokenBucket(1e9), TokenBucket(1e9)),
+        retry=RetryPolicy(retries=2, backoff=0.001, cap=1.0),
+    )
+    yield client
+    client.close()
+
+
+def scripted(*responses):
+    # Replies in order, then repeats the last one
+    responses = list(responses)
+
+    def respond(method, query):
+        status, headers = responses.pop(0) if len(responses) > 1 else responses[0]
+        return status, headers, page(query, pages=1)
+
+    return respond
+
+
+def workers() -> list[threading.Thread]:
+    return [t for t in threading.enumerate() if t.name == "paginate"]
+
+
+def test_retry_after_is_honoured(server, client):
+    server.respond = scripted((503, {"Retry-After": "0.2"}), (200, {}))
+
+    started = time.monotonic()
+    response = client.get("orders/historical/batch")
+    assert response.json()["orders"]
+    assert time.monotonic() - started >= 0.2
+    assert len(server.requests) == 2
+
+
+def test_post_is_retried_on_429_only(server, client):
+    server.respond = scripted((503, {}), (200, {}))
+    with pytest.raises(requests.HTTPError):
+        client.post("orders", data={"side": "BUY"})
+    assert len(server.requests) == 1
+
+    server.requests.clear()
+    server.respond = scripted((429, {"Retry-After": "0"}), (200, {}))
+    assert client.post("orders", data={"side": "BUY"}).ok
+    assert [method for method, _, _ in server.requests] == ["POST", "POST"]
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_exhausted_retries_report_the_failed_cursor(server, client, prefetch):
+    def respond(method, query):
+        if query.get("cursor") == "3":
+            return 503, {}, {}
+        return 200, {}, page(query)
+
+    server.respond = respond
+    seen = []
+    # With prefetch the error is raised on the worker and re-raised here
+    with pytest.raises(PaginationError) as error:
+        for item in client.paginate("orders/historical/batch", "orders", {}, prefetch):
+            seen.append(item["order_id"])
+
+    assert error.value.cursor == "3"
+    assert error.value.pages == 3
+    assert len(seen) == 30
+    # The first attempt plus two retries of the failed page
+    assert sum(query.get("cursor") == "3" for _, _, query in server.requests) == 3
+
+
+def test_limit_stops_the_prefetch_worker(server, client):
+    items = client.paginate(
+        "orders/historical/batch", "orders", {"limit": 25}, prefetch=2
+    )
+    assert len(list(items)) == 25
+
+    deadline = time.monotonic() + 2
+    while workers() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not workers()
+    # 3 pages consumed, at most the queue's depth plus one in flight more
+    assert len(server.requests) <= 6
+
+
+def test_early_close_stops_the_prefetch_worker(server, client):
+    items = client.paginate("orders/historical/batch", "orders", prefetch=2)
+    assert next(items)["order_id"] == "0-0"
+    items.close()
+
+    deadline = time.monotonic() + 2
+    while workers() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not workers()
+    count = len(server.requests)
+    time.sleep(0.1)
+    assert len(server.requests) == count
+
+
+def test_read_ahead_reraises_worker_errors():
+    closed = []
+
+    def produce():
+        try:
+            yield 1
+            yield 2
+            raise ValueError("page 3")
+        finally:
+            closed.append(True)
+
+    consumed = []
+    with pytest.raises(ValueError, match="page 3"):
+        for item in read_ahead(produce(), 1, name="test-read-ahead"):
+            consumed.append(item)
+    assert consumed == [1, 2]
+    assert closed == [True]
@@ -0,0 +1,60 @@
+"""
+tests/test_cost_average.py
+"""
+
+import numpy as np
+import pytest
+
+from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy.cost_average import CostAveraging
+from coinbot.strategy.dynamic_cost_average import DynamicCostAveraging
+from coinbot.strategy.fixed_point import to_units
+
+DAY = 86400
+START = 1577836800  # 2020-01-01
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = ValueAveragingDatabase(str(tmp_path / "ca.sqlite"))
+    yield database
+    database.close()
+
+
+def prices(size: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    return np.round(30000 * np.exp(np.cumsum(rng.normal(0, 0.05, size))), 2)
+
+
+@pytest.mark.parametrize(
+    "cls, table", [(CostAveraging, "ca_btc"), (DynamicCostAveraging, "dca_btc")]
+)
+def test_records_persist_and_resume(db, cls, table):
+    series = prices(40)
+    stamps = START + DAY * np.arange(len(series))
+    expected = cls("ref", 10).update_batch(series, stamps)
+
+    strategy = cls("btc", 10, db=db)
+    for price, stamp in zip(series[:25].tolist(), stamps[:25].tolist()):
+        strategy.update(price, stamp)
+    assert strategy.model._meta.table_name == table
+
+    resumed = cls("btc", 10, db=db, resume=True)
+    assert resumed.interval == 26
+    assert resumed.update(series[24], stamps[24]) is None
+    for price, stamp in zip(series[25:].tolist(), stamps[25:].tolist()):
+        resumed.update(price, stamp)
+
+    model = resumed.model
+    saved = list(model.select().order_by(model.id))
+    scales = resumed.scales(resumed.places(2))
+    assert [row.interval for row in saved] == expected["interval"].tolist()
+    for key in resumed.columns:
+        units = [to_units(getattr(row, key), scales[key]) for row in saved]
+        assert units == expected[key].tolist()
+
+
+def test_unattached_strategies_persist_nothing():
+    strategy = CostAveraging("btc", 10)
+    assert strategy.model is None
+    assert strategy.update(100.00, "2020-01-01")["interval"] == 1
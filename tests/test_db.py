@@ -0,0 +1,88 @@
+"""
+tests/test_db.py
+"""
+
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from coinbot.db import ValueAveragingDatabase
+
+
+def record(interval: int) -> dict:
+    return {
+        "exchange": "paper",
+        "date": datetime(2020, 1, interval, tzinfo=timezone.utc),
+        "market_price": Decimal("100.00"),
+        "current_target": Decimal("10.00"),
+        "current_value": Decimal("9.50"),
+        "trade_amount": Decimal("0.50"),
+        "total_trade_amount": Decimal("10.00"),
+        "order_size": Decimal("0.00500000"),
+        "total_order_size": Decimal("0.10000000"),
+        "interval": interval,
+    }
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = ValueAveragingDatabase(str(tmp_path / "db.sqlite"))
+    yield database
+    database.close()
+
+
+def test_failed_flush_keeps_rows(db):
+    model = db.get_model("btc")
+    writer = db.writer(size=100, interval=60)
+    writer.extend(model, [record(1), record(2)])
+
+    db.db.execute_sql("DROP TABLE va_btc")
+    with pytest.raises(Exception):
+        writer.flush()
+    assert writer.pending == 2
+    assert writer.written == 0
+
+    db.tables(refresh=True)
+    db.get_models(["btc"])
+    writer.add(model, record(3))
+    assert writer.flush() == 3
+    assert [row.interval for row in model.select().order_by(model.id)] == [1, 2, 3]
+
+
+def test_quiet_buffer_flushes_on_timer(db):
+    model = db.get_model("eth")
+    writer = db.writer(size=100, interval=0.05)
+    writer.add(model, record(1))
+
+    deadline = time.monotonic() + 5
+    while not writer.written and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.written == 1
+    assert writer.pending == 0
+    assert model.select().count() == 1
+
+
+def test_failing_timed_flush_backs_off(db, caplog):
+    model = db.get_model("sol")
+    writer = db.writer(size=100, interval=0.01)
+    writer.backoff = 0.2
+    db.db.execute_sql("DROP TABLE va_sol")
+    writer.add(model, record(1))
+
+    time.sleep(0.6)
+    failures = [r for r in caplog.records if "Timed flush" in r.getMessage()]
+    # 0.01, 0.02, 0.04 ... capped at 0.2 seconds between attempts
+    assert 2 <= len(failures) <= 10
+    assert writer.pending == 1
+
+    db.tables(refresh=True)
+    db.get_models(["sol"])
+    assert writer.flush() == 1
+
+
+def test_in_memory_writer_is_not_timed():
+    database = ValueAveragingDatabase(":memory:")
+    assert not database.writer().timed
+    database.close()
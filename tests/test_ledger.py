@@ -0,0 +1,96 @@
+"""
+tests/test_ledger.py
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from coinbot.db import ValueAveragingDatabase
+from coinbot.ledger import LedgerStore
+
+
+def record(day: datetime, interval: int) -> dict:
+    return {
+        "exchange": "paper",
+        "date": day,
+        "market_price": Decimal("100.00"),
+        "current_target": Decimal("10.00"),
+        "current_value": Decimal("9.50"),
+        "trade_amount": Decimal("0.50"),
+        "total_trade_amount": Decimal("10.00"),
+        "order_size": Decimal("0.00500000"),
+        "total_order_size": Decimal("0.10000000"),
+        "interval": interval,
+    }
+
+
+def days(*dates: str) -> list[datetime]:
+    return [datetime.fromisoformat(date).replace(tzinfo=timezone.utc) for date in dates]
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = ValueAveragingDatabase(str(tmp_path / "ledger.sqlite"))
+    yield database
+    database.close()
+
+
+def by_id(columns: dict) -> dict:
+    order = np.argsort(columns["id"])
+    return {name: values[order] for name, values in columns.items()}
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (None, None),
+        ("2021-01-03", "2021-01-06"),
+        ("2020-01-08", "2021-01-02"),
+        (None, "2020-01-05"),
+        ("2021-01-01", None),
+    ],
+)
+def test_out_of_order_exports_round_trip(db, tmp_path, start, end):
+    model = db.get_model("btc")
+    store = LedgerStore(str(tmp_path / "ledger.h5"))
+
+    # Each export appends later ids; the second and third carry earlier dates
+    batches = [
+        days("2021-01-01", "2021-01-02", "2021-01-04", "2021-01-05"),
+        days("2020-01-01", "2020-01-04", "2021-01-03"),
+        days("2020-01-10", "2021-01-02", "2021-01-07"),
+    ]
+    interval = 1
+    for batch in batches:
+        for day in batch:
+            model.create(**record(day, interval))
+            interval += 1
+        store.export(db, ["btc"])
+
+    columns = ["id", "date", "interval"]
+    expected = by_id(db.read("btc", start, end, columns))
+    actual = by_id(store.load("btc", start, end, columns))
+    assert len(expected["id"]) > 0
+    for name in columns:
+        np.testing.assert_array_equal(actual[name], expected[name])
+
+    restored = ValueAveragingDatabase(str(tmp_path / "restored.sqlite"))
+    assert store.restore(restored, ["btc"]) == {"btc": interval - 1}
+    copy = by_id(restored.read("btc", start, end, columns))
+    restored.close()
+    for name in columns:
+        np.testing.assert_array_equal(copy[name], expected[name])
+
+
+def test_sorted_exports_bisect(db, tmp_path):
+    model = db.get_model("eth")
+    store = LedgerStore(str(tmp_path / "ledger.h5"))
+    for i, day in enumerate(days("2020-01-01", "2020-01-02", "2020-01-03")):
+        model.create(**record(day, i + 1))
+        store.export(db, ["eth"])
+
+    loaded = store.load("eth", "2020-01-02", "2020-01-03", ["interval"])
+    np.testing.assert_array_equal(loaded["interval"], [2])
@@ -0,0 +1,42 @@
+"""
+tests/test_portfolio.py
+"""
+
+import numpy as np
+import pytest
+
+from coinbot.db import ValueAveragingDatabase
+from coinbot.portfolio import Portfolio
+from coinbot.strategy.value_average import ValueAveraging
+
+DAY = 86400
+START = 1577836800  # 2020-01-01
+PRICES = [100.00, 90.00, 95.00, 80.00, 110.00]
+
+
+def resumed(path) -> ValueAveraging:
+    db = ValueAveragingDatabase(str(path))
+    va = ValueAveraging("btc", 10, 0.10, 365, db=db)
+    va.update(PRICES[0], START)
+    va.update(PRICES[1], START + DAY)
+    return ValueAveraging("btc", 10, 0.10, 365, db=db, resume=True)
+
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_resumed_run_skips_recorded_ticks(tmp_path, persist):
+    clock = START + DAY * np.arange(len(PRICES))
+    prices = {"btc": np.array(PRICES)}
+    prices["btc"][3] = np.nan
+
+    va = resumed(tmp_path / f"{persist}.sqlite")
+    report = Portfolio({"btc": va}, va.db).run(clock, prices, persist)
+    va.db.close()
+
+    reference = resumed(tmp_path / "reference.sqlite")
+    expected = Portfolio({"btc": reference}, reference.db).run(clock, prices, True)
+    reference.db.close()
+
+    assert va.interval == 5
+    np.testing.assert_array_equal(report["cash_flow"][:2], [0, 0])
+    for name in ("value", "cash_flow", "invested"):
+        np.testing.assert_allclose(report[name], expected[name])
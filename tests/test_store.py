@@ -0,0 +1,52 @@
+"""
+tests/test_store.py
+"""
+
+import numpy as np
+import pytest
+
+from coinbot.coinbase.candles import COLUMNS
+from coinbot.store import CURRENT, CandleStore
+
+DAY = 86400
+START = 1577836800  # 2020-01-01
+
+
+class Product:
+    def candles_range(self, product_id, start, end, granularity):
+        starts = np.arange(start, end, DAY, dtype=np.int64)
+        columns = {"start": starts}
+        columns.update({key: starts / DAY for key in COLUMNS[1:]})
+        return columns
+
+
+def test_fill_swaps_whole_versions(tmp_path):
+    store = CandleStore(Product(), root=str(tmp_path))
+    assert store.fill("BTC-USD", DAY, START, START + 10 * DAY) == 10
+    assert store.fill("BTC-USD", DAY, START + 20 * DAY, START + 30 * DAY) == 10
+
+    folder = store.path("BTC-USD", DAY)
+    versions = sorted(entry.name for entry in folder.iterdir() if entry.is_dir())
+    assert len(versions) == 2
+    assert (folder / CURRENT).read_text() in versions
+
+    candles = store.load("BTC-USD", DAY)
+    assert len(candles["start"]) == 20
+    assert store.ranges("BTC-USD", DAY) == [
+        [START, START + 10 * DAY],
+        [START + 20 * DAY, START + 30 * DAY],
+    ]
+
+    store.fill("BTC-USD", DAY, START + 40 * DAY, START + 41 * DAY)
+    assert len([entry for entry in folder.iterdir() if entry.is_dir()]) == 2
+
+
+def test_load_rejects_mismatched_columns(tmp_path):
+    store = CandleStore(Product(), root=str(tmp_path))
+    store.fill("BTC-USD", DAY, START, START + 10 * DAY)
+
+    folder = store.path("BTC-USD", DAY)
+    version = folder / (folder / CURRENT).read_text()
+    np.save(version / "close.npy", np.zeros(3))
+    with pytest.raises(ValueError):
+        store.load("BTC-USD", DAY)
@@ -0,0 +1,127 @@
+"""
+tests/test_stream.py
+"""
+
+import json
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from coinbot.coinbase.stream import MarketStream
+
+PRODUCT = "BTC-USD"
+
+
+def level(side: str, price: str, quantity: str) -> dict:
+    return {"side": side, "price_level": price, "new_quantity": quantity}
+
+
+def l2(sequence: int, kind: str, *updates: dict) -> dict:
+    return {
+        "channel": "l2_data",
+        "sequence_num": sequence,
+        "events": [{"type": kind, "product_id": PRODUCT, "updates": list(updates)}],
+    }
+
+
+SESSION = [
+    l2(
+        0,
+        "snapshot",
+        level("bid", "100.00", "1"),
+        level("bid", "99.00", "2"),
+        level("offer", "101.00", "1"),
+        level("offer", "102.00", "3"),
+    ),
+    l2(1, "update", level("bid", "100.50", "0.5"), level("offer", "101.00", "0")),
+    {
+        "channel": "ticker",
+        "sequence_num": 2,
+        "events": [{"tickers": [{"product_id": PRODUCT, "price": "100.75"}]}],
+    },
+    # Sequence 3 is lost: the book is dropped until the next snapshot
+    l2(4, "update", level("bid", "100.75", "9")),
+    l2(5, "update", level("bid", "100.80", "9")),
+]
+RESYNC = l2(6, "snapshot", level("bid", "98.00", "1"), level("offer", "99.00", "4"))
+
+
+def record(path, messages) -> str:
+    with open(path, "w") as f:
+        f.writelines(json.dumps(message) + "\n" for message in messages)
+    return str(path)
+
+
+def test_replay_applies_updates_and_resyncs_after_a_gap(tmp_path):
+    stream = MarketStream([PRODUCT])
+    book = stream.books[PRODUCT]
+
+    assert stream.replay(record(tmp_path / "a.jsonl", SESSION[:3])) == 3
+    assert stream.best_bid_ask(PRODUCT) == {
+        "product_id": PRODUCT,
+        "ready": True,
+        "bid": (Decimal("100.50"), Decimal("0.5")),
+        "ask": (Decimal("102.00"), Decimal("3")),
+    }
+    assert book.depth("bid") == [
+        (Decimal("100.50"), Decimal("0.5")),
+        (Decimal("100.00"), Decimal("1")),
+        (Decimal("99.00"), Decimal("2")),
+    ]
+    assert book.rank("offer", "101.50") == 0
+    assert stream.tickers[PRODUCT]["price"] == "100.75"
+
+    stream.replay(record(tmp_path / "b.jsonl", SESSION[3:]))
+    assert stream.gaps == 1
+    assert stream.best_bid_ask(PRODUCT) == {
+        "product_id": PRODUCT,
+        "ready": False,
+        "bid": None,
+        "ask": None,
+    }
+    assert book.spread is None
+
+    stream.replay(record(tmp_path / "c.jsonl", [RESYNC]))
+    quote = stream.best_bid_ask(PRODUCT)
+    assert quote["ready"]
+    assert quote["bid"] == (Decimal("98.00"), Decimal("1"))
+    assert book.spread == Decimal("1.00")
+
+
+def test_local_server_replay(tmp_path):
+    server_module = pytest.importorskip("websockets.sync.server")
+    lines = [json.dumps(message) for message in [*SESSION, RESYNC]]
+    received = []
+
+    def handler(connection):
+        for line in lines:
+            connection.send(line)
+        # Keep the socket open and collect the subscriptions sent back
+        for message in connection:
+            received.append(json.loads(message))
+
+    server = server_module.serve(handler, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.socket.getsockname()[1]
+
+    stream = MarketStream([PRODUCT], url=f"ws://127.0.0.1:{port}")
+    stream.start()
+    try:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if stream.sequence == 6 and len(received) >= 5:
+                break
+            time.sleep(0.01)
+    finally:
+        stream.stop()
+        server.shutdown()
+
+    assert stream.gaps == 1
+    assert stream.best_bid_ask(PRODUCT)["bid"] == (Decimal("98.00"), Decimal("1"))
+    # Three subscriptions on open, then the level2 renewal after the gap
+    assert [(m["type"], m["channel"]) for m in received[3:]] == [
+        ("unsubscribe", "level2"),
+        ("subscribe", "level2"),
+    ]
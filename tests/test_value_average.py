@@ -0,0 +1,174 @@
+"""
+tests/test_value_average.py
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from coinbot.db import ValueAveragingDatabase
+from coinbot.strategy import value_average
+from coinbot.strategy.fixed_point import to_units
+from coinbot.strategy.schedule import TargetSchedule
+from coinbot.strategy.value_average import ValueAveraging
+
+# 10.00 / 40.96 == 0.244140625 sits exactly on a half-satoshi tie, so the
+# first record takes the Decimal fallback of value_average_step
+TIE_PRICE = 40.96
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = ValueAveragingDatabase(str(tmp_path / "va.sqlite"))
+    yield database
+    database.close()
+
+
+def rows(va: ValueAveraging) -> list[dict]:
+    model = va.model
+    return [
+        {key: value for key, value in row.items() if key != "id"}
+        for row in model.select().order_by(model.id).dicts()
+    ]
+
+
+def test_resume_is_opt_in(db):
+    va = ValueAveraging("btc", 10, 0.10, 365, db=db)
+    va.update(100.00, "2020-01-01")
+
+    fresh = ValueAveraging("btc", 10, 0.10, 365, db=db)
+    assert fresh.interval == 1
+    assert fresh.last_timestamp is None
+
+
+def test_resume_skips_replayed_ticks(db):
+    va = ValueAveraging("btc", 10, 0.10, 365, db=db)
+    for day, price in [("2020-01-01", 100.00), ("2020-01-02", 90.00)]:
+        va.update(price, day)
+    saved = rows(va)
+
+    resumed = ValueAveraging("btc", 10, 0.10, 365, db=db, resume=True)
+    assert resumed.interval == 3
+    assert resumed.update(90.00, "2020-01-02T00:00:00Z") is None
+    assert resumed.update(80.00, "2020-01-01") is None
+    assert rows(resumed) == saved
+
+    assert resumed.update(95.00, "2020-01-03")["interval"] == 3
+    assert [row["interval"] for row in rows(resumed)] == [1, 2, 3]
+
+
+def test_numeric_ticks_are_stored_as_dates(db):
+    va = ValueAveraging("btc", 10, 0.10, 365, db=db)
+    start = 1577836800  # 2020-01-01
+    va.update(100.00, start)
+    va.update(90.00, np.int64(start + 86400))
+
+    np.testing.assert_array_equal(db.read("btc")["date"], [start, start + 86400])
+    resumed = ValueAveraging("btc", 10, 0.10, 365, db=db, resume=True)
+    assert resumed.last_timestamp == start + 86400
+
+
+def test_resume_batch_drops_replayed_ticks(db):
+    va = ValueAveraging("btc", 10, 0.10, 365, db=db)
+    va.update(100.00, "2020-01-01")
+    va.update(90.00, "2020-01-02")
+
+    resumed = ValueAveraging("btc", 10, 0.10, 365, db=db, resume=True)
+    day = 86400
+    start = 1577836800  # 2020-01-01
+    columns = resumed.update_batch(
+        np.array([100.00, 90.00, 95.00]),
+        np.array([start, start + day, start + 2 * day]),
+    )
+    np.testing.assert_array_equal(columns["interval"], [3])
+    np.testing.assert_array_equal(columns["date"], [start + 2 * day])
+    assert resumed.interval == 4
+
+
+def prices(size: int) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    series = np.round(30000 * np.exp(np.cumsum(rng.normal(0, 0.03, size))), 2)
+    series[0] = TIE_PRICE
+    return series
+
+
+def days(size: int) -> list[str]:
+    return [(date(2020, 1, 1) + timedelta(days=i)).isoformat() for i in range(size)]
+
+
+def record_rows(va: ValueAveraging, series: np.ndarray) -> list[tuple[int, ...]]:
+    # The reference path: one Decimal record per tick, persisted
+    scales = va.scales(va.places(2))
+    stamps = days(len(series))
+    records = [va.initialize_first_record(float(series[0]), stamps[0])]
+    for price, stamp in zip(series[1:].tolist(), stamps[1:]):
+        records.append(va.update_records(price, stamp))
+    return [
+        (
+            record["interval"],
+            *(to_units(record[key], scales[key]) for key in va.columns),
+        )
+        for record in records
+    ]
+
+
+def batch_rows(columns: dict, keys) -> list[tuple[int, ...]]:
+    return list(
+        zip(columns["interval"].tolist(), *(columns[key].tolist() for key in keys))
+    )
+
+
+@pytest.fixture
+def fallbacks(monkeypatch):
+    # Count the records that take the Decimal tie fallback
+    calls = []
+    step = value_average._decimal_step
+
+    def spy(*args):
+        calls.append(args)
+        return step(*args)
+
+    monkeypatch.setattr(value_average, "_decimal_step", spy)
+    return calls
+
+
+@pytest.mark.parametrize("chunks", [[200], [1, 7, 50, 142], [99, 1, 100]])
+def test_update_batch_matches_update_records(db, fallbacks, chunks):
+    series = prices(sum(chunks))
+
+    va = ValueAveraging("ref", 10, 0.10, 365, db=db)
+    expected = record_rows(va, series)
+    assert fallbacks
+    fallbacks.clear()
+
+    batch = ValueAveraging("batch", 10, 0.10, 365, db=db)
+    stamps = np.arange(len(series))
+    actual, offset = [], 0
+    for size in chunks:
+        window = slice(offset, offset + size)
+        columns = batch.update_batch(series[window], stamps[window])
+        actual += batch_rows(columns, batch.columns)
+        offset += size
+
+    assert fallbacks
+    assert actual == expected
+    assert batch.interval == va.interval
+    assert batch.total_order_units == va.total_order_units
+    assert batch.total_trade_units == va.total_trade_units
+    assert len(rows(va)) == len(series)
+
+
+def test_interleaved_strategies_keep_their_schedules(monkeypatch):
+    monkeypatch.setattr(TargetSchedule, "shared_size", 1)
+    strategies = [
+        ValueAveraging(f"s{i}", 10 + i, 0.10, 365, persist=False) for i in range(3)
+    ]
+    schedules = [va.schedule for va in strategies]
+    for day, price in enumerate([100.00, 90.00, 95.00]):
+        for va in strategies:
+            va.update(price, f"2020-01-0{day + 1}")
+
+    assert [va.schedule for va in strategies] == schedules
+    # Each curve was built once and only grew; none was rebuilt after eviction
+    assert all(len(schedule) >= 3 for schedule in schedules)